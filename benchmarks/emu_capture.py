@@ -0,0 +1,69 @@
+"""Oscilloscope capture benchmark on emulated hardware.
+
+Installs emulated Mercury devices (see `redpitaya.drv.emu`)
+and measures capture latency (start to `wait_done`)
+and `data()` readout throughput, so it runs on any Linux machine::
+
+    python3 benchmarks/emu_capture.py --repeat 100
+"""
+import time
+import argparse
+import numpy as np
+
+from redpitaya.drv.emu import emu
+from redpitaya.drv.osc import osc
+
+
+def capture_latency(dev: osc, repeat: int) -> np.ndarray:
+    """Return capture latencies in seconds."""
+    latency = np.empty(repeat)
+    for i in range(repeat):
+        start = time.perf_counter()
+        dev.reset()
+        dev.start_trigger()
+        dev.wait_done()
+        latency[i] = time.perf_counter() - start
+    return latency
+
+
+def readout(dev: osc, repeat: int, dtype) -> float:
+    """Return readout throughput in samples per second."""
+    out = np.empty(dev.buffer_size, dtype=dtype)
+    start = time.perf_counter()
+    for i in range(repeat):
+        dev.data(out=out)
+    return repeat * dev.buffer_size / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=100, help='number of repetitions')
+    args = parser.parse_args()
+
+    devices = emu.mercury()
+    try:
+        dev = osc(0, 1.0)
+        dev.trigger_pre = 0
+        dev.trigger_post = dev.buffer_size
+        print('capture latency [ms] (expected = buffer fill time)')
+        print('  {:>10s} {:>10s} {:>10s} {:>10s}'.format('decimation', 'expected', 'median', 'p99'))
+        for decimation in (1, 8, 64, 256):
+            dev.decimation = decimation
+            latency = capture_latency(dev, args.repeat)
+            print('  {:10d} {:10.3f} {:10.3f} {:10.3f}'.format(decimation, dev.capture_time * 1e3,
+                                                              np.median(latency) * 1e3,
+                                                              np.percentile(latency, 99) * 1e3))
+        print('readout [Msamples/s]')
+        print('  {:>10s} {:>10s} {:>10s}'.format('dtype', 'multiply', 'lookup'))
+        for dtype in (np.float32, np.float64):
+            speed = []
+            for dev.lookup in (False, True):
+                speed.append(readout(dev, args.repeat, dtype) / 1e6)
+            print('  {:>10s} {:10.3f} {:10.3f}'.format(np.dtype(dtype).name, *speed))
+        dev.close()
+    finally:
+        emu.close_all()
+
+
+if __name__ == '__main__':
+    main()
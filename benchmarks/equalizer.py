@@ -0,0 +1,40 @@
+"""Oscilloscope input filter model throughput benchmark.
+
+Measures samples per second filtered by `redpitaya.dsp.equalizer`
+for a range of batch sizes (rows), with the default IIR evaluation
+and with IIR stages evaluated sample by sample, on a noisy sine
+of binary samples::
+
+    python3 benchmarks/equalizer.py --samples 1048576
+"""
+import time
+import argparse
+import numpy as np
+
+from redpitaya.dsp.equalizer import equalizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=2**20, help='number of filtered samples')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    t = np.arange(args.samples)
+    x = (20000 * np.sin(2 * np.pi * t / 777) + rng.normal(0, 2, args.samples)).astype(np.int16)
+    print('MS/s filtered')
+    print('  {:>6s} {:>10s} {:>10s}'.format('rows', 'default', 'per sample'))
+    for rows in (1, 4, 16, 64, 256, 1024):
+        line = '  {:6d}'.format(rows)
+        for loop_rows in (equalizer._LOOP_ROWS, 1):
+            model = equalizer()
+            model._LOOP_ROWS = loop_rows
+            batch = x[:args.samples // rows * rows].reshape(rows, -1)
+            start = time.perf_counter()
+            model.filter(batch)
+            line += ' {:10.1f}'.format(batch.size / (time.perf_counter() - start) / 1e6)
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Measurement engine throughput benchmark.
+
+Measures records per second of `redpitaya.dsp.measure`
+for a batch of noisy square wave records of 16k samples
+(two channels), for a range of chunk sizes::
+
+    python3 benchmarks/measure.py --records 512 --repeat 5
+"""
+import time
+import argparse
+import numpy as np
+
+from redpitaya.dsp.measure import measure
+
+
+def records(channels: int, n: int, size: int) -> np.ndarray:
+    """Square waves with random frequency, duty cycle and noise, as `int16` samples."""
+    rng = np.random.default_rng(0)
+    t = np.arange(size)
+    period = rng.uniform(50, 2000, (channels, n, 1))
+    duty = rng.uniform(0.2, 0.8, (channels, n, 1))
+    phase = (t / period + rng.uniform(0, 1, (channels, n, 1))) % 1
+    data = np.where(phase < duty, 6000, -6000) + rng.normal(0, 50, (channels, n, size))
+    return data.astype(np.int16)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=512, help='number of records per channel')
+    parser.add_argument('--size', type=int, default=2**14, help='number of samples in a record')
+    parser.add_argument('--repeat', type=int, default=5, help='number of repetitions')
+    args = parser.parse_args()
+
+    data = records(2, args.records, args.size)
+    print('records per second ({} samples)'.format(args.size))
+    print('  {:>6s} {:>10s}'.format('chunk', 'records/s'))
+    for chunk in (4, 8, 16, 32, 64):
+        start = time.perf_counter()
+        for i in range(args.repeat):
+            measure(data, 1 / 125e6, chunk=chunk)
+        elapsed = time.perf_counter() - start
+        print('  {:6d} {:10.0f}'.format(chunk, data.shape[0] * data.shape[1] * args.repeat / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Spectrum analyser throughput benchmark.
+
+Measures spectra per second of `redpitaya.dsp.spectrum`
+for frame sizes from 1k to 16k points, compared to a naive
+implementation allocating the window and spectrum each frame,
+and optionally including readout from an emulated oscilloscope::
+
+    python3 benchmarks/spectrum.py --repeat 1000 --emu
+"""
+import time
+import argparse
+import numpy as np
+import scipy.signal
+
+from redpitaya.dsp.spectrum import spectrum
+
+
+def naive(frame: np.ndarray, sample_rate: float) -> np.ndarray:
+    window = scipy.signal.get_window('hann', len(frame))
+    power = np.absolute(np.fft.rfft(frame * window))**2 * 2 / (sample_rate * np.sum(window**2))
+    return 10 * np.log10(power)
+
+
+def rate(function, repeat: int) -> float:
+    """Return calls per second."""
+    start = time.perf_counter()
+    for i in range(repeat):
+        function()
+    return repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=1000, help='number of repetitions')
+    parser.add_argument('--emu', action='store_true', help='include readout from an emulated oscilloscope')
+    args = parser.parse_args()
+
+    if args.emu:
+        from redpitaya.drv.emu import emu
+        from redpitaya.drv.osc import osc
+        devices = emu.mercury()
+        dev = osc(0, 1.0)
+    try:
+        print('spectra per second')
+        print('  {:>6s} {:>10s} {:>10s} {:>10s}'.format('size', 'naive', 'spectrum', 'osc' if args.emu else ''))
+        for size in (2**10, 2**11, 2**12, 2**13, 2**14):
+            frame = np.random.default_rng(0).normal(size=size)
+            s = spectrum(size, 125e6, averaging='exponential')
+            line = '  {:6d} {:10.0f} {:10.0f}'.format(size,
+                rate(lambda: naive(frame, 125e6), args.repeat),
+                rate(lambda: (s.update(frame), s.density()), args.repeat))
+            if args.emu:
+                line += ' {:10.0f}'.format(rate(lambda: (s.acquire(dev), s.density()), args.repeat))
+            print(line)
+    finally:
+        if args.emu:
+            dev.close()
+            emu.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Software trigger throughput benchmark.
+
+Measures samples per second scanned by `redpitaya.dsp.trigger`
+in each mode, for a range of block sizes, on a noisy sine
+of binary samples, to be compared with the 125 MS/s sample rate::
+
+    python3 benchmarks/trigger.py --samples 4194304
+"""
+import time
+import argparse
+import numpy as np
+
+from redpitaya.dsp.trigger import trigger
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=2**22, help='number of scanned samples')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    t = np.arange(args.samples)
+    x = (8000 * np.sin(2 * np.pi * t / 1000) + rng.normal(0, 300, args.samples)).astype(np.int16)
+    sizes = (2**10, 2**12, 2**14)
+    print('MS/s scanned')
+    print('  {:>6s}'.format('mode') + ''.join(' {:>10d}'.format(size) for size in sizes))
+    for mode in trigger.modes:
+        line = '  {:>6s}'.format(mode)
+        for size in sizes:
+            trg = trigger((-2000, 3000), mode=mode, width=(100, 600))
+            start = time.perf_counter()
+            for i in range(0, args.samples, size):
+                trg.scan(x[i:i+size])
+            line += ' {:10.1f}'.format(args.samples / (time.perf_counter() - start) / 1e6)
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""UIO driver startup benchmark.
+
+Compares UIO map discovery through `pyudev` (previous implementation)
+with direct sysfs reads and the per-process map cache,
+and measures construction time for all Mercury drivers.
+
+Run on the board with the Mercury overlay loaded::
+
+    python3 benchmarks/uio_startup.py --repeat 100
+"""
+import os
+import glob
+import time
+import argparse
+
+from redpitaya.drv.uio  import uio, _uio_maps
+from redpitaya.drv.hwid import hwid
+from redpitaya.drv.mgmt import mgmt
+from redpitaya.drv.clb  import clb
+from redpitaya.drv.gen  import gen
+from redpitaya.drv.osc  import osc
+from redpitaya.drv.lg   import lg
+from redpitaya.drv.la   import la
+
+
+def discover_pyudev(node: str):
+    import pyudev
+    device = pyudev.Devices.from_device_file(pyudev.Context(), node)
+    maps = []
+    for uio_map in os.listdir(os.path.join(device.sys_path, 'maps')):
+        maps.append([device.attributes.asstring('maps/'+uio_map+'/'+name) for name in ('name', 'addr', 'offset', 'size')])
+    return maps
+
+
+def discover_sysfs(node: str):
+    return _uio_maps.__wrapped__(uio.sysfs, os.path.basename(os.path.realpath(node)))
+
+
+def discover_cached(node: str):
+    return _uio_maps(uio.sysfs, os.path.basename(os.path.realpath(node)))
+
+
+def construct():
+    drivers = [hwid(), mgmt(), clb(), gen(0), gen(1), osc(0, 1.0), osc(1, 1.0), lg(), la()]
+    del(drivers)
+
+
+def measure(function, repeat: int, *args) -> float:
+    """Return average execution time in seconds."""
+    start = time.perf_counter()
+    for i in range(repeat):
+        function(*args)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=100, help='number of repetitions')
+    args = parser.parse_args()
+
+    nodes = sorted(glob.glob('/dev/uio/*'))
+    methods = [('sysfs', discover_sysfs), ('cached', discover_cached)]
+    try:
+        import pyudev
+        methods.insert(0, ('pyudev', discover_pyudev))
+    except ImportError:
+        print('pyudev is not installed, skipping the reference measurement.')
+
+    print('map discovery for {} device nodes [us/node]'.format(len(nodes)))
+    for name, method in methods:
+        total = sum(measure(method, args.repeat, node) for node in nodes)
+        print('  {:8s} {:10.1f}'.format(name, total / len(nodes) * 1e6))
+
+    print('driver construction [ms/set]')
+    _uio_maps.cache_clear()
+    print('  {:8s} {:10.3f}'.format('first', measure(construct, 1) * 1e3))
+    print('  {:8s} {:10.3f}'.format('cached', measure(construct, args.repeat) * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1 @@
-__all__ = ['overlay', 'drv', 'app']
+__all__ = ['overlay', 'drv', 'daq', 'dsp', 'app']
@@ -1,5 +1,7 @@
 # FPGA configuration and API
 from redpitaya.overlay.mercury import mercury as overlay
+from redpitaya.daq.worker import worker
+from redpitaya.dsp.display import display as decimator
 
 # system and mathematics libraries
 import time
@@ -22,24 +24,22 @@ from IPython.lib import backgroundjobs as bg
 
 class oscilloscope (object):
 
-    size = 1250
+    # captured samples (whole buffer) and displayed pixel columns
+    size = overlay.osc.buffer_size
+    columns = 1250
     range_max = 1.2
-
-    # time per division (10 divisions on screen)
-    x_scales = [  '5s' ,   '2s' ,   '1s' ,
-                '500ms', '200ms', '100ms',
-                 '50ms',  '20ms',  '10ms',
-                  '5ms',   '2ms',   '1ms',
-                '500us', '200us', '100us',
-                 '50us',  '20us',  '10us',
-                  '5us',   '2us',   '1us']
-    x_scales_dict = {  '5s' :   5000000,   '2s' :   2000000,   '1s' :   1000000,
-                     '500ms':    500000, '200ms':    200000, '100ms':    100000,
-                      '50ms':     50000,  '20ms':     20000,  '10ms':     10000,
-                       '5ms':      5000,   '2ms':      2000,   '1ms':      1000,
-                     '500us':       500, '200us':       200, '100us':       100,
-                      '50us':        50,  '20us':        20,  '10us':        10,
-                       '5us':         5,   '2us':         2,   '1us':         1}
+    # time allowed for the trigger on top of the capture time,
+    # before the capture is restarted, so the worker can be stopped
+    trigger_timeout = 1.0
+
+    # decimation factors selectable by X scale
+    x_decimations = [5000000, 2000000, 1000000,
+                      500000,  200000,  100000,
+                       50000,   20000,   10000,
+                        5000,    2000,    1000,
+                         500,     200,     100,
+                          50,      20,      10,
+                           5,       2,       1]
 
     def __init__ (self, channels = [0, 1], input_range = [1.0, 1.0]):
         """Oscilloscope application"""
@@ -66,16 +66,36 @@ class oscilloscope (object):
             self.osc[ch].trigger_pre  = self.size//2
             self.osc[ch].trigger_post = self.size//2
 
+        # time per division (10 divisions over the whole buffer)
+        self.x_scales = [self.time_label(self.size * dec / overlay.osc.FS / 10) for dec in self.x_decimations]
+        self.x_scales_dict = dict(zip(self.x_scales, self.x_decimations))
+
+        # whole buffer is reduced to a min/max envelope of pixel columns,
+        # so glitches are visible at constant cost per frame
+        self.view = decimator(self.size, self.columns)
+
         # default trigger source
         self.t_source = 0
 
         # display widgets
         self.display()
 
-        # threads
+        # threads, capture runs in a worker thread, while the previous capture is rendered
+        if len(self.channels) == 2:
+            # both channels from one start and one pointer
+            acquire = self.acquire_pair
+        else:
+            acquire = None
+        self.worker = worker([self.osc[ch] for ch in self.channels], self.size, queue=1, acquire=acquire)
+        self.worker.start()
         self.jobs = bg.BackgroundJobManager()
         self.jobs.new('self.run()')
 
+    def acquire_pair(self, out):
+        # the capture time depends on the current decimation
+        timeout = self.osc[0].capture_time + self.trigger_timeout
+        self.ovl.acquire_pair(self.osc[0], self.osc[1], self.size, out=out, timeout=timeout)
+
 #    def __del__ (self):
 #        # close widgets
 #        for ch in self.channels:
@@ -85,10 +105,17 @@ class oscilloscope (object):
 #        # TODO: overlay should not be removed if a different app added it
 #        del (self.ovl)
 
+    @staticmethod
+    def time_label (t):
+        for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+            if t >= scale:
+                return '{:.3g}{}'.format(t / scale, unit)
+        return '{:.3g}ns'.format(t * 1e9)
+
     def display (self):
         ch = 0
-        self.x = (np.arange(self.size) - self.osc[ch].trigger_pre) / self.osc[ch].sample_rate
-        buff = [np.zeros(self.size) for ch in self.channels]
+        self.x = (self.view.x - self.osc[ch].trigger_pre) / self.osc[ch].sample_rate
+        buff = [np.zeros(self.view.points) for ch in self.channels]
         rmax = 1.0
         
         #output_notebook(resources=INLINE)
@@ -161,7 +188,7 @@ class oscilloscope (object):
 
     def clb_x_update (self):
         ch = 0
-        self.x = (np.arange(self.size) - self.osc[ch].trigger_pre) / self.osc[ch].sample_rate
+        self.x = (self.view.x - self.osc[ch].trigger_pre) / self.osc[ch].sample_rate
         for ch in self.channels:
             self.r[ch].data_source.data['x'] = self.x
         self.p.x_range.start = self.x[ 0]
@@ -198,14 +225,11 @@ class oscilloscope (object):
         self.p.y_range.end   = osc.y_position + osc.y_scale
 
     def run (self):
-        while True:
-            ch = 0
-            self.osc[ch].reset()
-            self.osc[ch].start()
-            while self.osc[ch].status_run(): pass
-            #buff = np.absolute(np.fft.fft(buff))
-            for ch in self.channels:
-                self.r[ch].data_source.data['y'] = self.osc[ch].data(self.size)
+        for seq, buff, timestamp in self.worker:
+            # a new envelope array each frame, the buffer is returned to the worker pool
+            _, envelope = self.view.reduce(buff)
+            for i, ch in enumerate(self.channels):
+                self.r[ch].data_source.data['y'] = envelope[i]
             # push updates to the plot continuously using the handle (intererrupt the notebook kernel to stop)
             push_notebook(handle=self.target)
             #time.sleep(0.05)
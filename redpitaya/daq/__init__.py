@@ -0,0 +1 @@
+__all__ = ['ring', 'broker', 'worker', 'recorder']
@@ -0,0 +1,354 @@
+import os
+import json
+import time
+import signal
+import socket
+import argparse
+import threading
+import socketserver
+import numpy as np
+
+from .ring import ring
+
+
+class broker(object):
+    """Device broker.
+
+    A single process owns the acquisition drivers (`osc`, `la`)
+    and generators (`gen`), so the exclusive UIO lock is held only once.
+    Captures are published into shared memory rings (:class:`ring`),
+    which any number of client processes read zero-copy.
+    Clients (:class:`client`) send control requests over a local
+    UNIX socket, one JSON object per line.
+
+    Requests have the form ``{"cmd": <command>, ...}``:
+
+    * ``rings`` - return ``{device: shared memory name}``,
+    * ``get``, ``set`` - read a driver attribute from :attr:`readable`
+      or write one from :attr:`writable`
+      (``{"cmd": "set", "dev": "osc0", "attr": "decimation", "value": 8}``),
+    * ``arm`` - capture ``count`` records (0 for continuous),
+      optionally with a ``software`` trigger,
+    * ``disarm`` - stop capturing.
+
+    Replies are ``{"ok": true, "value": ...}``
+    or ``{"ok": false, "error": <exception name>, "message": ...}``.
+
+    The broker for the Mercury FPGA image is started with
+    ``python3 -m redpitaya.daq.broker`` (see :func:`main`).
+
+    Parameters
+    ----------
+    devices : dict
+        Drivers by name, for example ``{'osc0': osc0, 'osc1': osc1, 'gen0': gen0}``.
+        Drivers with a `buffer` and `pointer` get a capture ring.
+    path : str, optional
+        UNIX socket path.
+    depth : int, optional
+        Number of records in each ring.
+    timeout : float, optional
+        Timeout for a single capture in seconds.
+    """
+    #: attributes clients are allowed to write
+    writable = ('decimation', 'average', 'filter_bypass', 'input_range',
+                'trigger_pre', 'trigger_post', 'level', 'edge',
+                'sync_src', 'trig_src',
+                'frequency', 'phase', 'amplitude', 'offset', 'enable', 'mode')
+    #: attributes clients are allowed to read
+    readable = writable + ('sample_rate', 'pointer')
+
+    def __init__(self, devices: dict, path: str = '/tmp/redpitaya-broker.sock', depth: int = 16, timeout: float = 1.0):
+        self.devices = devices
+        self.path = path
+        self.timeout = timeout
+        self.rings = {name: ring(depth=depth, size=len(dev.buffer))
+                      for name, dev in devices.items() if hasattr(dev, 'pointer')}
+        # remaining captures per armed device (0 is continuous)
+        self.armed = {}
+        self.software = set()
+        self._armed_lock = threading.Lock()
+        self._armed_event = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.server = socketserver.ThreadingUnixStreamServer(self.path, self._handler_t)
+        self.server.daemon_threads = True
+        self.server.broker = self
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        """Start serving requests and capturing in background threads."""
+        self._threads = [threading.Thread(target=self.server.serve_forever, daemon=True),
+                         threading.Thread(target=self.run, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def close(self):
+        """Stop threads, remove the socket and shared memory rings."""
+        self._stop.set()
+        self._armed_event.set()
+        if self._threads:
+            self.server.shutdown()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.server.server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        for buf in self.rings.values():
+            buf.close()
+
+    def run(self):
+        """Capture loop, records are captured from armed devices in turn."""
+        while not self._stop.is_set():
+            self._armed_event.wait()
+            with self._armed_lock:
+                armed = list(self.armed)
+            for name in armed:
+                if self._stop.is_set():
+                    break
+                self.capture(name)
+
+    def capture(self, name: str) -> bool:
+        """Capture one record from device `name` and publish it into its ring."""
+        dev = self.devices[name]
+        buf = self.rings[name]
+        with dev.uio_lock:
+            dev.reset()
+            if name in self.software:
+                dev.start_trigger()
+            else:
+                dev.start()
+        if not dev.wait_done(timeout=self.timeout):
+            return False
+        with dev.uio_lock:
+            ptr = int(dev.pointer)
+            timestamp = time.time()
+            # align the oldest sample to the record start
+            data = np.ctypeslib.as_array(dev.buffer)
+            seq = buf.seq
+            slot = buf.slot(seq)
+            slot[:buf.size - ptr] = data[ptr:]
+            slot[buf.size - ptr:] = data[:ptr]
+        buf.publish(seq, ptr, timestamp)
+        with self._armed_lock:
+            if name in self.armed:
+                if self.armed[name] == 1:
+                    self._disarm(name)
+                elif self.armed[name] > 1:
+                    self.armed[name] -= 1
+        return True
+
+    def arm(self, name: str, count: int = 0, software: bool = False):
+        """Capture `count` records from device `name`, 0 captures continuously."""
+        if name not in self.rings:
+            raise ValueError("Device {} can not capture, capture devices are {}.".format(name, list(self.rings)))
+        with self._armed_lock:
+            self.armed[name] = count
+            if software:
+                self.software.add(name)
+            else:
+                self.software.discard(name)
+            self._armed_event.set()
+
+    def disarm(self, name: str):
+        """Stop capturing from device `name`."""
+        with self._armed_lock:
+            self._disarm(name)
+
+    def _disarm(self, name: str):
+        self.armed.pop(name, None)
+        self.software.discard(name)
+        if not self.armed:
+            self._armed_event.clear()
+
+    def request(self, req: dict):
+        """Execute a single client request and return its value."""
+        cmd = req.get('cmd')
+        if cmd == 'rings':
+            return {name: buf.name for name, buf in self.rings.items()}
+        elif cmd in ('get', 'set'):
+            dev = self.devices[req['dev']]
+            attr = req['attr']
+            if attr not in self.readable:
+                raise AttributeError("Attribute {} is not accessible, use one of {}.".format(attr, self.readable))
+            if cmd == 'set' and attr not in self.writable:
+                raise AttributeError("Attribute {} is read only, writable are {}.".format(attr, self.writable))
+            with dev.uio_lock:
+                if cmd == 'set':
+                    setattr(dev, attr, req['value'])
+                value = getattr(dev, attr)
+            return value.item() if isinstance(value, np.generic) else value
+        elif cmd == 'arm':
+            self.arm(req['dev'], req.get('count', 0), req.get('software', False))
+        elif cmd == 'disarm':
+            self.disarm(req['dev'])
+        else:
+            raise ValueError("Unknown command {}.".format(cmd))
+
+    class _handler_t(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                try:
+                    reply = {'ok': True, 'value': self.server.broker.request(json.loads(line))}
+                except Exception as e:
+                    reply = {'ok': False, 'error': type(e).__name__, 'message': str(e)}
+                self.wfile.write(json.dumps(reply).encode() + b'\n')
+
+
+class client(object):
+    """Client for :class:`broker`.
+
+    Parameters
+    ----------
+    path : str, optional
+        Broker UNIX socket path.
+
+    Example::
+
+        with client() as c:
+            c.set('osc0', 'decimation', 8)
+            c.arm('osc0', count=1, software=True)
+            osc0 = c.ring('osc0')
+            osc0.wait(0)
+            data, meta = osc0.read(0)
+    """
+    _errors = {'ValueError': ValueError, 'AttributeError': AttributeError,
+               'KeyError': KeyError, 'TypeError': TypeError}
+
+    def __init__(self, path: str = '/tmp/redpitaya-broker.sock'):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.socket.connect(path)
+        except OSError as e:
+            self.socket.close()
+            raise IOError(e.errno, "Connecting to broker {}: {}".format(path, e.strerror))
+        self.file = self.socket.makefile('rwb')
+        self.rings = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        for buf in self.rings.values():
+            buf.close()
+        self.rings = {}
+        self.file.close()
+        self.socket.close()
+
+    def request(self, **req):
+        """Send a request to the broker and return the reply value."""
+        self.file.write(json.dumps(req).encode() + b'\n')
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise IOError("Broker closed the connection.")
+        reply = json.loads(line)
+        if not reply['ok']:
+            raise self._errors.get(reply['error'], IOError)(reply['message'])
+        return reply['value']
+
+    def get(self, dev: str, attr: str):
+        """Read driver attribute."""
+        return self.request(cmd='get', dev=dev, attr=attr)
+
+    def set(self, dev: str, attr: str, value):
+        """Write driver attribute, the value read back is returned."""
+        return self.request(cmd='set', dev=dev, attr=attr, value=value)
+
+    def arm(self, dev: str, count: int = 0, software: bool = False):
+        """Capture `count` records (0 for continuous) into the device ring."""
+        self.request(cmd='arm', dev=dev, count=count, software=software)
+
+    def disarm(self, dev: str):
+        """Stop capturing."""
+        self.request(cmd='disarm', dev=dev)
+
+    def ring(self, dev: str) -> ring:
+        """Attach to the capture ring of device `dev`."""
+        if dev not in self.rings:
+            self.rings[dev] = ring(name=self.request(cmd='rings')[dev])
+        return self.rings[dev]
+
+
+def mercury_devices(input_range: float = 1.0, emulate: bool = False) -> tuple:
+    """Open Mercury FPGA drivers served by the broker.
+
+    Parameters
+    ----------
+    input_range : float, optional
+        Oscilloscope input range.
+    emulate : bool, optional
+        Use drivers over emulated devices (see :mod:`emu`),
+        instead of loading the FPGA overlay.
+
+    Returns
+    -------
+    tuple
+        Loaded overlay (`None` if emulated) and drivers by name.
+        The overlay is removed when it is deleted,
+        keep it until the drivers are closed.
+    """
+    if emulate:
+        from redpitaya.drv.osc import osc
+        from redpitaya.drv.gen import gen
+        from redpitaya.drv.la import la
+        overlay = None
+    else:
+        from redpitaya.overlay.mercury import mercury
+        overlay = mercury()
+        osc, gen, la = mercury.osc, mercury.gen, mercury.la
+    return overlay, {'osc0': osc(0, input_range),
+                     'osc1': osc(1, input_range),
+                     'gen0': gen(0),
+                     'gen1': gen(1),
+                     'la'  : la()}
+
+
+def main(argv: list = None):
+    """Serve Mercury FPGA drivers until interrupted (`SIGINT`, `SIGTERM`)::
+
+        python3 -m redpitaya.daq.broker --path /tmp/redpitaya-broker.sock
+    """
+    parser = argparse.ArgumentParser(description='Red Pitaya device broker.')
+    parser.add_argument('--path', default='/tmp/redpitaya-broker.sock', help='UNIX socket path')
+    parser.add_argument('--depth', type=int, default=16, help='number of records in each ring')
+    parser.add_argument('--timeout', type=float, default=1.0, help='timeout for a single capture in seconds')
+    parser.add_argument('--input-range', type=float, default=1.0, help='oscilloscope input range')
+    parser.add_argument('--emulate', action='store_true', help='serve emulated devices')
+    args = parser.parse_args(argv)
+
+    if args.emulate:
+        from redpitaya.drv.emu import emu
+        emu.mercury()
+    overlay, devices = mercury_devices(args.input_range, args.emulate)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    try:
+        with broker(devices, path=args.path, depth=args.depth, timeout=args.timeout):
+            try:
+                stop.wait()
+            except KeyboardInterrupt:
+                pass
+    finally:
+        for dev in devices.values():
+            dev.close()
+        # remove the overlay after its drivers are closed
+        del overlay
+        if args.emulate:
+            emu.close_all()
+
+
+if __name__ == '__main__':
+    main()
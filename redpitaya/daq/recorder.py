@@ -0,0 +1,280 @@
+import os
+import time
+import queue
+import threading
+import numpy as np
+
+
+# file header, padded to a page, so records start page aligned
+_HEADER_SIZE = 4096
+_MAGIC = b'RPREC\x00\x00\x01'
+
+_header_t = np.dtype([('magic'   , 'S8'    ),  # file type
+                      ('channels', np.int64),  # channels in a record
+                      ('size'    , np.int64),  # samples per channel
+                      ('count'   , np.int64)]) # number of written records
+
+
+def record_t(channels: int, size: int) -> np.dtype:
+    """Record data type, metadata followed by binary samples.
+
+    Per channel `gain` and `offset` convert samples into volts,
+    ``volts = gain * sample + offset``.
+    """
+    return np.dtype([('seq'         , np.int64  ),  # record number
+                     ('timestamp'   , np.float64),  # host time at capture
+                     ('pointer'     , np.int64  ),  # buffer pointer at capture time
+                     ('dna'         , np.uint64 ),  # FPGA DNA (hwid)
+                     ('decimation'  , np.uint32 ),
+                     ('trigger_pre' , np.uint32 ),
+                     ('trigger_post', np.uint32 ),
+                     ('trig_src'    , np.uint32 ),
+                     ('input_range' , np.float32, (channels,)),
+                     ('level'       , np.float32, (channels, 2)),
+                     ('edge'        , np.uint8  , (channels,)),
+                     ('gain'        , np.float64, (channels,)),
+                     ('offset'      , np.float64, (channels,)),
+                     ('data'        , np.int16  , (channels, size))], align=True)
+
+
+class recorder(object):
+    """Capture recorder into a single preallocated file.
+
+    Binary `int16` records are appended together with per record
+    metadata (see :func:`record_t`) by a writer thread,
+    so acquisition is not blocked by storage. The file is grown
+    in chunks of `chunk` records to avoid fragmentation
+    and frequent metadata updates on SD cards, the number of
+    written records is kept in the file header and the unused
+    part of the last chunk is removed on :meth:`close`.
+    Recordings are read back with :class:`recording`::
+
+        with recorder('run.rec', 1024, channels=2, dna=hwid.dna) as rec:
+            for seq, data, timestamp in capture_worker:
+                rec.append(data, [osc0, osc1], timestamp=timestamp)
+
+    An existing file with the same record shape is appended to.
+
+    Parameters
+    ----------
+    path : str
+        File path.
+    size : int
+        Number of samples per channel in a record.
+    channels : int, optional
+        Number of channels in a record.
+    chunk : int, optional
+        Number of records preallocated at once.
+    depth : int, optional
+        Number of records queued for the writer thread,
+        :meth:`append` blocks when the queue is full.
+    dna : int, optional
+        FPGA DNA stored into records (:attr:`hwid.dna`).
+
+    Attributes
+    ----------
+    count : int
+        Number of written records.
+    """
+
+    def __init__(self, path: str, size: int, channels: int = 1, chunk: int = 1024, depth: int = 16, dna: int = 0):
+        self.path = path
+        self.size = size
+        self.channels = channels
+        self.chunk = chunk
+        self.dna = dna
+        self.dtype = record_t(channels, size)
+        self.file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        self.header = np.zeros((), dtype=_header_t)
+        if os.fstat(self.file.fileno()).st_size:
+            self.header = np.frombuffer(os.pread(self.file.fileno(), _header_t.itemsize, 0), dtype=_header_t)[0].copy()
+            if self.header['magic'] != _MAGIC:
+                self.file.close()
+                raise ValueError("File {} is not a recording.".format(path))
+            if (self.header['channels'], self.header['size']) != (channels, size):
+                self.file.close()
+                raise ValueError("Recording shape should be {}.".format((int(self.header['channels']), int(self.header['size']))))
+        else:
+            self.header['magic'] = _MAGIC
+            self.header['channels'] = channels
+            self.header['size'] = size
+        self.count = int(self.header['count'])
+        self.allocated = self.count
+        self.seq = self.count
+        # record buffers, filled by append and written by the thread
+        self._slots = np.zeros(depth, dtype=self.dtype)
+        self._blank = np.zeros((), dtype=self.dtype)
+        self._free = queue.Queue()
+        for i in range(depth):
+            self._free.put(i)
+        self._queue = queue.Queue()
+        self.error = None
+        self._write_header()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _offset(self, index: int) -> int:
+        return _HEADER_SIZE + index * self.dtype.itemsize
+
+    def _write_header(self):
+        self.header['count'] = self.count
+        os.pwrite(self.file.fileno(), self.header.tobytes(), 0)
+
+    def _allocate(self):
+        """Grow the file by a chunk."""
+        start = self._offset(self.allocated)
+        self.allocated += self.chunk
+        fd = self.file.fileno()
+        if hasattr(os, 'posix_fallocate'):
+            os.posix_fallocate(fd, start, self._offset(self.allocated) - start)
+        else:
+            os.ftruncate(fd, self._offset(self.allocated))
+
+    def run(self):
+        """Writer loop."""
+        fd = self.file.fileno()
+        try:
+            while True:
+                index = self._queue.get()
+                if index is None:
+                    break
+                if self.count >= self.allocated:
+                    self._allocate()
+                os.pwrite(fd, self._slots[index:index+1].tobytes(), self._offset(self.count))
+                self._free.put(index)
+                self.count += 1
+                # update the header when the writer is idle
+                if self._queue.empty():
+                    self._write_header()
+        except Exception as e:
+            self.error = e
+            # release a blocked append
+            self._free.put(None)
+
+    def append(self, data: np.ndarray, devices: list = None, pointer: int = 0, timestamp: float = None) -> int:
+        """Queue a record for writing.
+
+        Parameters
+        ----------
+        data : ndarray
+            Binary samples of shape ``(channels, size)``.
+        devices : list of :class:`osc`, optional
+            Oscilloscopes, one for each channel, their settings
+            are stored as metadata. Decimation, trigger delays
+            and trigger source are taken from the first one.
+        pointer : int, optional
+            Buffer pointer at capture time.
+        timestamp : float, optional
+            Host time of the capture, by default the current time.
+
+        Returns
+        -------
+        int
+            Record number.
+        """
+        if self.error is not None:
+            raise self.error
+        index = self._free.get()
+        if index is None:
+            raise self.error
+        # slots are reused, clear metadata of the previous record
+        self._slots[index] = self._blank
+        rec = self._slots[index]
+        rec['data'] = np.reshape(data, (self.channels, self.size))
+        rec['seq'] = self.seq
+        rec['timestamp'] = time.time() if timestamp is None else timestamp
+        rec['pointer'] = pointer
+        rec['dna'] = self.dna
+        if devices is not None:
+            dev = devices[0]
+            rec['decimation'] = dev.decimation
+            rec['trigger_pre'] = dev.trigger_pre
+            rec['trigger_post'] = dev.trigger_post
+            rec['trig_src'] = dev.trig_src
+            for ch, dev in enumerate(devices):
+                gain, offset = dev.calibration
+                rec['input_range'][ch] = dev.input_range
+                rec['level'][ch] = dev.level
+                rec['edge'][ch] = dev._edges[dev.edge]
+                rec['gain'][ch] = gain * dev.input_range / dev._DWr
+                rec['offset'][ch] = offset
+        self._queue.put(index)
+        self.seq += 1
+        return self.seq - 1
+
+    def close(self):
+        """Write queued records, remove unused preallocated space and close the file."""
+        if self.file is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        try:
+            self._write_header()
+            self.file.truncate(self._offset(self.count))
+        finally:
+            self.file.close()
+            self.file = None
+        if self.error is not None:
+            raise self.error
+
+
+class recording(object):
+    """Memory mapped readback of a :class:`recorder` file.
+
+    Opening does not read records, slices of :attr:`records`
+    and :attr:`data` are loaded from the file on access::
+
+        rec = recording('run.rec')
+        rec.data[1000:2000, 0]      # channel 0 of 1000 records
+        rec.records['timestamp']    # all timestamps
+        rec.volts(slice(0, 10))
+
+    Parameters
+    ----------
+    path : str
+        File path.
+
+    Attributes
+    ----------
+    records : memmap
+        Structured array of records (:func:`record_t`).
+    data : memmap
+        Binary samples of shape ``(count, channels, size)``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.refresh()
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def refresh(self):
+        """Map the file again, to include records written since opening."""
+        header = np.fromfile(self.path, dtype=_header_t, count=1)
+        if not len(header) or header[0]['magic'] != _MAGIC:
+            raise ValueError("File {} is not a recording.".format(self.path))
+        header = header[0]
+        self.channels = int(header['channels'])
+        self.size = int(header['size'])
+        self.dtype = record_t(self.channels, self.size)
+        count = int(header['count'])
+        if count:
+            self.records = np.memmap(self.path, dtype=self.dtype, mode='r', offset=_HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=self.dtype)
+        self.data = self.records['data']
+
+    def volts(self, index) -> np.ndarray:
+        """Samples of records `index` (int or slice) converted into volts."""
+        rec = self.records[index]
+        return rec['data'] * rec['gain'][..., None] + rec['offset'][..., None]
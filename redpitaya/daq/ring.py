@@ -0,0 +1,188 @@
+import time
+import numpy as np
+
+from multiprocessing import shared_memory
+from multiprocessing import resource_tracker
+
+
+class ring(object):
+    """Shared memory ring buffer of fixed size sample records.
+
+    A single writer process publishes records with :meth:`push`,
+    any number of reader processes attach to the same ring by name
+    and get zero-copy NumPy views of the records with :meth:`read`.
+
+    The ring holds `depth` slots, record number `seq` is stored
+    into slot ``seq % depth``. Each slot has a sequence number,
+    which is set to -1 while the slot is being written,
+    so readers can check with :meth:`valid` whether a record
+    they are still using was overwritten in the meantime.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of an existing shared memory block to attach to,
+        by default a new block is created.
+    depth : int, optional
+        Number of slots (only used when creating).
+    size : int, optional
+        Number of samples in a record (only used when creating).
+    dtype : optional
+        Sample data type (only used when creating).
+
+    Attributes
+    ----------
+    data : ndarray
+        Array of shape ``(depth, size)`` over all slots.
+    meta : ndarray
+        Structured array with per slot sequence number,
+        buffer pointer and host timestamp.
+    """
+    _header_t = np.dtype([('seq'  , np.int64),   # number of published records
+                          ('depth', np.int64),   # number of slots
+                          ('size' , np.int64),   # samples per record
+                          ('dtype', np.int64)])  # sample type (numpy type number)
+    _meta_t   = np.dtype([('seq'      , np.int64),    # record number, -1 while writing
+                          ('pointer'  , np.int64),    # buffer pointer at capture time
+                          ('timestamp', np.float64)]) # host time at capture
+
+    _dtypes = (np.int16, np.int32, np.float32, np.float64)
+
+    # names of blocks created by this process
+    _created = set()
+
+    def __init__(self, name: str = None, depth: int = 16, size: int = 2**14, dtype = np.int16):
+        if name is None:
+            dtype = np.dtype(dtype)
+            self.shm = shared_memory.SharedMemory(create=True, size=self._size(depth, size, dtype))
+            self.owner = True
+            self._created.add(self.shm.name)
+        else:
+            # only the creating process should remove the block at exit
+            try:
+                self.shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                # Python < 3.13, attaching registers the block with the resource tracker,
+                # unregistering in the creating process would drop the creator's registration
+                self.shm = shared_memory.SharedMemory(name=name)
+                if name not in self._created:
+                    resource_tracker.unregister(self.shm._name, 'shared_memory')
+            self.owner = False
+
+        self.header = np.ndarray((), dtype=self._header_t, buffer=self.shm.buf)
+        if self.owner:
+            self.header['seq'  ] = 0
+            self.header['depth'] = depth
+            self.header['size' ] = size
+            self.header['dtype'] = self._dtypes.index(dtype.type)
+        self.depth = int(self.header['depth'])
+        self.size  = int(self.header['size'])
+        dtype = np.dtype(self._dtypes[int(self.header['dtype'])])
+
+        offset = self._header_t.itemsize
+        self.meta = np.ndarray((self.depth,), dtype=self._meta_t, buffer=self.shm.buf, offset=offset)
+        offset += self.depth * self._meta_t.itemsize
+        self.data = np.ndarray((self.depth, self.size), dtype=dtype, buffer=self.shm.buf, offset=offset)
+        if self.owner:
+            self.meta['seq'] = -1
+
+    @classmethod
+    def _size(cls, depth: int, size: int, dtype) -> int:
+        return cls._header_t.itemsize + depth * (cls._meta_t.itemsize + size * dtype.itemsize)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Detach from the shared memory block, the owner also removes it."""
+        if self.shm is None:
+            return
+        # views must be released before the block can be closed
+        del(self.header, self.meta, self.data)
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+            self._created.discard(self.shm.name)
+        self.shm = None
+
+    @property
+    def name(self) -> str:
+        """Shared memory block name, used by readers to attach."""
+        return self.shm.name
+
+    @property
+    def seq(self) -> int:
+        """Number of records published so far."""
+        return int(self.header['seq'])
+
+    def slot(self, seq: int) -> np.ndarray:
+        """Writer access to the slot for record `seq`, to be filled in place before :meth:`publish`."""
+        self.meta['seq'][seq % self.depth] = -1
+        return self.data[seq % self.depth]
+
+    def publish(self, seq: int, pointer: int = 0, timestamp: float = None):
+        """Mark record `seq` written into its :meth:`slot` as complete."""
+        meta = self.meta[seq % self.depth]
+        meta['pointer'] = pointer
+        meta['timestamp'] = time.time() if timestamp is None else timestamp
+        meta['seq'] = seq
+        self.header['seq'] = seq + 1
+
+    def push(self, data: np.ndarray, pointer: int = 0, timestamp: float = None) -> int:
+        """Copy a record into the next slot and publish it.
+
+        Returns
+        -------
+        int
+            Record sequence number.
+        """
+        seq = self.seq
+        self.slot(seq)[:] = data
+        self.publish(seq, pointer, timestamp)
+        return seq
+
+    def valid(self, seq: int) -> bool:
+        """Check whether record `seq` is still stored in the ring."""
+        return int(self.meta['seq'][seq % self.depth]) == seq
+
+    def read(self, seq: int = None):
+        """Zero-copy access to a record.
+
+        The returned view points into shared memory,
+        it is overwritten after `depth` further records,
+        use :meth:`valid` after processing to check
+        the data was not overwritten while in use.
+
+        Parameters
+        ----------
+        seq : int, optional
+            Record number, by default the latest record.
+
+        Returns
+        -------
+        tuple
+            Data view and metadata record.
+        """
+        if seq is None:
+            seq = self.seq - 1
+        if seq < 0 or not self.valid(seq):
+            raise ValueError("Record {} is not available, ring contains records [{},{}).".format(seq, max(self.seq - self.depth, 0), self.seq))
+        return (self.data[seq % self.depth], self.meta[seq % self.depth].copy())
+
+    def wait(self, seq: int, timeout: float = None, period: float = 1e-3) -> bool:
+        """Wait until record `seq` is published.
+
+        Returns
+        -------
+        bool
+            `False` if the timeout expired.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.seq <= seq:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(period)
+        return True
@@ -0,0 +1,285 @@
+import time
+import threading
+import collections
+import numpy as np
+
+from redpitaya.drv.transaction import transaction
+
+
+class worker(object):
+    """Background capture thread with a pool of preallocated buffers.
+
+    The thread captures from acquisition drivers (`osc`, `la`)
+    into buffers taken from a pool, while consumers process
+    previously captured buffers, so processing (for example plotting)
+    does not stop acquisition. Captures are passed to consumers
+    through a bounded queue::
+
+        with worker([osc0, osc1], 1024, queue=1) as w:
+            for seq, data, timestamp in w:
+                plot(data)
+
+    Queue policies, when consumers do not keep up:
+
+    * `drop`: the oldest queued capture is dropped (counted in :attr:`drops`),
+      so consumers always get recent data,
+    * `block`: the thread waits for consumers before the next capture,
+      so no capture is lost, but acquisition is paced by consumers.
+
+    A buffer returned by :meth:`get` is owned by the consumer
+    until it is returned to the pool with :meth:`release`,
+    the iterator releases it when the next capture is requested.
+
+    Parameters
+    ----------
+    devices : list
+        Acquisition drivers, one row of the buffer each.
+    size : int
+        Number of samples in each capture, ending at the last sample.
+    queue : int, optional
+        Maximum number of queued captures.
+    pool : int, optional
+        Number of buffers, by default `queue` plus one being captured
+        and one being processed.
+    policy : str, optional
+        One of :attr:`policies`.
+    dtype : data-type, optional
+        Buffer data type, an integer type reads binary samples
+        (:meth:`osc.raw`), a float type volts (:meth:`osc.data`).
+    trigger : bool, optional
+        Trigger each capture by software, instead of waiting
+        for the configured hardware trigger.
+    timeout : float, optional
+        Timeout for a single capture, expired captures are counted
+        in :attr:`timeouts` and restarted. By default wait forever.
+    acquire : callable, optional
+        Function ``acquire(out)`` filling the buffer `out`
+        of shape ``(len(devices), size)``, for example
+        :meth:`mercury.acquire_pair`, replaces :meth:`capture`.
+        It should raise :class:`TimeoutError` to be restarted.
+
+    Attributes
+    ----------
+    captures : int
+        Number of captures.
+    drops : int
+        Number of captures dropped from the queue.
+    timeouts : int
+        Number of expired captures.
+    rate : float
+        Captures per second, updated about once per second.
+    error : Exception
+        Exception, which stopped the thread, raised again by :meth:`get`.
+    """
+    #: queue policies
+    policies = ('drop', 'block')
+
+    def __init__(self, devices: list, size: int, queue: int = 2, pool: int = None, policy: str = 'drop',
+                 dtype = np.float64, trigger: bool = False, timeout: float = None, acquire = None):
+        if policy not in self.policies:
+            raise ValueError("Queue policy should be one of {}.".format(self.policies))
+        if queue < 1:
+            raise ValueError("Queue size should be positive.")
+        if pool is None:
+            pool = queue + 2
+        elif pool < 2:
+            raise ValueError("Pool should contain at least 2 buffers.")
+        self.devices = list(devices)
+        self.size = size
+        self.queue = queue
+        self.policy = policy
+        self.trigger = trigger
+        self.timeout = timeout
+        if acquire is not None:
+            self.capture = acquire
+        self.buffers = np.empty((pool, len(self.devices), size), dtype=dtype)
+        # free buffer indices, queued and held captures
+        self._free = collections.deque(range(pool))
+        self._ready = collections.deque()
+        self._held = {}
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self.seq = 0
+        self.captures = 0
+        self.drops = 0
+        self.timeouts = 0
+        self.rate = 0.0
+        self.error = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        item = None
+        try:
+            while True:
+                if item is not None:
+                    self.release(item[0])
+                item = self.get()
+                if item is None:
+                    return
+                yield item
+        finally:
+            if item is not None:
+                self.release(item[0])
+
+    @property
+    def depth(self) -> int:
+        """Number of queued captures."""
+        return len(self._ready)
+
+    @property
+    def running(self) -> bool:
+        """Capture thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start capturing in a background thread."""
+        if self.running:
+            return
+        self._stop.clear()
+        self.error = None
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop the capture thread, queued captures remain available."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run(self):
+        """Capture loop."""
+        rate_time, rate_count = time.monotonic(), 0
+        try:
+            while not self._stop.is_set():
+                index = self._take()
+                if index is None:
+                    break
+                try:
+                    done = self.capture(self.buffers[index])
+                except TimeoutError:
+                    self.timeouts += 1
+                    done = False
+                if done is False:
+                    with self._cond:
+                        self._free.append(index)
+                    continue
+                self._put(index, time.time())
+                now = time.monotonic()
+                if now - rate_time >= 1.0:
+                    self.rate = (self.captures - rate_count) / (now - rate_time)
+                    rate_time, rate_count = now, self.captures
+        except Exception as e:
+            self.error = e
+        finally:
+            with self._cond:
+                self._cond.notify_all()
+
+    def _take(self) -> int:
+        """Take a free buffer, according to the queue policy."""
+        with self._cond:
+            while not self._stop.is_set():
+                if self.policy == 'block' and len(self._ready) >= self.queue:
+                    pass
+                elif self._free:
+                    return self._free.popleft()
+                elif self._ready and self.policy == 'drop':
+                    self.drops += 1
+                    return self._ready.popleft()[1]
+                self._cond.wait()
+        return None
+
+    def _put(self, index: int, timestamp: float):
+        """Queue a captured buffer."""
+        with self._cond:
+            self._ready.append((self.seq, index, timestamp))
+            self.seq += 1
+            self.captures += 1
+            if len(self._ready) > self.queue:
+                self.drops += 1
+                self._free.append(self._ready.popleft()[1])
+            self._cond.notify_all()
+
+    def capture(self, out: np.ndarray) -> bool:
+        """Capture from all devices into `out`.
+
+        Devices are started together in a :class:`transaction`
+        and should be configured (trigger, decimation) beforehand.
+
+        Returns
+        -------
+        bool
+            `False` if the capture was interrupted by :meth:`close`.
+        """
+        with transaction(*self.devices):
+            for dev in self.devices:
+                dev.reset()
+                if self.trigger:
+                    dev.start_trigger()
+                else:
+                    dev.start()
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        for dev in self.devices:
+            # wait in slices, so the thread can be stopped
+            while not dev.wait_done(0.1):
+                if self._stop.is_set():
+                    return False
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError("Capture was not acquired within {} s.".format(self.timeout))
+        for dev, row in zip(self.devices, out):
+            ptr = (dev.pointer - self.size) % dev.buffer_size
+            if not hasattr(dev, 'raw'):
+                row[:] = dev.data(self.size, ptr)
+            elif np.issubdtype(out.dtype, np.integer):
+                dev.raw(self.size, ptr, out=row)
+            else:
+                dev.data(self.size, ptr, out=row)
+        return True
+
+    def get(self, timeout: float = None) -> tuple:
+        """Take the oldest queued capture.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Timeout in seconds, by default wait forever.
+
+        Returns
+        -------
+        tuple
+            ``(seq, data, timestamp)``, `seq` is the capture number,
+            gaps show dropped captures, `data` is a buffer
+            of shape ``(len(devices), size)`` valid until :meth:`release`,
+            `timestamp` is the host time at the end of the capture.
+            `None` if the thread is stopped and the queue is empty.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._ready:
+                if self.error is not None:
+                    raise self.error
+                if not self.running:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No capture was queued within {} s.".format(timeout))
+                self._cond.wait(remaining)
+            seq, index, timestamp = self._ready.popleft()
+            self._held[seq] = index
+            self._cond.notify_all()
+        return (seq, self.buffers[index], timestamp)
+
+    def release(self, seq: int):
+        """Return the buffer of capture `seq` to the pool."""
+        with self._cond:
+            self._free.append(self._held.pop(seq))
+            self._cond.notify_all()
@@ -1 +1 @@
-__all__ = ['overlay', 'uio', 'evn', 'hwid', 'mgmt', 'pdm', 'clb', 'wave', 'gen', 'osc', 'lg', 'la']
\ No newline at end of file
+__all__ = ['overlay', 'uio', 'uio_mux', 'emu', 'trace', 'shadow', 'transaction', 'evn', 'hwid', 'mgmt', 'pdm', 'clb', 'wave', 'gen', 'osc', 'lg', 'la']
\ No newline at end of file
@@ -71,3 +71,12 @@ class acq(object):
     def trigger_post_status(self) -> int:
         """Post trigger sample counter status."""
         return (self.regset.acq.sts_pst & 0x7fffffff)
+
+    @property
+    def capture_time(self) -> float:
+        """Minimum acquisition time in seconds.
+
+        Time needed to store pre and post trigger samples,
+        waiting for the trigger is not included.
+        """
+        return (self.trigger_pre + self.trigger_post) * self.sample_period
@@ -52,16 +52,15 @@ class clb(uio):
 
     def __init__(self, uio: str = '/dev/uio/clb'):
         super().__init__(uio)
-        self.regset = self._regset_t.from_buffer(self.uio_mmaps[0])
 
         self.dac = [self.DAC(self.regset.dac[ch]) for ch in self.channels_dac]
         self.adc = [self.ADC(self.regset.adc[ch]) for ch in self.channels_adc]
 
-    def __del__(self):
-        del(self.regset)
-        del(self.dac)
-        del(self.adc)
-        super().__del__()
+    def close(self):
+        # channel objects hold views into the register set
+        self.dac = []
+        self.adc = []
+        super().close()
 
     def default(self):
         """Set registers into default (power-up) state."""
@@ -257,6 +256,22 @@ class clb(uio):
         else:
             raise ValueError("ADC range can be one of [ 1, 20 ].")
 
+    def calib_adc_residual (self, clb_struct, ch: int, input_range: float) -> tuple:
+        """Residual ADC calibration not represented by FPGA registers.
+
+        Returns ratio of requested and applied gain,
+        and difference of requested and applied offset in ADC codes.
+        """
+        if   (input_range == 1):
+            cal = clb_struct.adc[ch].lo
+        elif (input_range == 20):
+            cal = clb_struct.adc[ch].hi
+        else:
+            raise ValueError("ADC range can be one of [ 1, 20 ].")
+        gain   = cal.gain / self.adc[ch].gain if self.adc[ch].gain else 1.0
+        offset = (cal.offset - self.adc[ch].offset) * self.ADC._DWr
+        return (gain, offset)
+
     def calib_apply (self, clb_struct, adc_range = ['lo', 'lo']):
         for ch in self.channels_adc:
             if   (adc_range[ch] == 'lo'):
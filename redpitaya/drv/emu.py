@@ -0,0 +1,504 @@
+import os
+import sys
+import mmap
+import time
+import socket
+import threading
+import numpy as np
+from ctypes import sizeof
+
+from .uio  import _uio_map, _uio_handle
+from .evn  import evn
+from .hwid import hwid
+from .mgmt import mgmt
+from .pdm  import pdm
+from .clb  import clb
+from .gen  import gen
+from .osc  import osc
+from .lg   import lg
+from .la   import la
+
+
+class _emu_map(_uio_map):
+    def __init__(self, index: int, name: str, addr: int, size: int):
+        self.index  = index
+        self.name   = name
+        self.addr   = addr
+        self.offset = 0
+        self.size   = size
+
+
+class _emu_handle(_uio_handle):
+    """Handle for an emulated device.
+
+    Memory belongs to the emulated device, so register values
+    persist after the last handle is released, like on hardware.
+    """
+    def __init__(self, device, path: str, sysfs: str):
+        self.path = path
+        self.key = os.path.realpath(path)
+        self.refs = 0
+        self.lock = threading.RLock()
+        self.dev = device.irq_dev
+        self.irq = True
+        self.maps = device.maps
+        self.mmaps = list(device.mmaps)
+        self.fds = device.fds
+        self.views = {}
+        self.mirrors = {}
+
+    def source(self, index: int) -> tuple:
+        return self.fds[index], 0
+
+    def close(self):
+        self.views = {}
+        self.mirrors = {}
+        self.mmaps = [None] * len(self.maps)
+
+
+class emu(object):
+    """Emulated UIO device.
+
+    Instead of a `/dev/uio/*` node, the device is backed by anonymous memory
+    (or files in a tmpfs directory) laid out like the driver `_regset_t`
+    (map 0) and `_buffer_t` (map 1). After installation, drivers opening
+    the device node get the emulated memory, so the `drv` layer can be
+    tested and benchmarked on any Linux machine::
+
+        devices = emu.mercury()
+        osc0 = osc(0, 1.0)
+        osc0.start_trigger()
+        osc0.wait_done()
+
+    An optional behavioural `model` runs in a background thread
+    and updates status registers, buffers and interrupts.
+    The interrupt is emulated with a socket, which behaves
+    like the UIO device file for :meth:`uio.irq_enable`,
+    :meth:`uio.irq_wait` and polling.
+
+    Parameters
+    ----------
+    path : str
+        Device node path (for example `/dev/uio/osc0`).
+    driver : type
+        Driver class defining `_regset_t` and optionally `_buffer_t`.
+    model : :class:`acq_model`, optional
+        Behavioural model.
+    shm : str, optional
+        Directory (tmpfs) for map files, by default anonymous memory is used.
+    addr : int, optional
+        Emulated physical address of map 0.
+    """
+    #: installed devices by node path
+    devices = {}
+
+    _addr = 0x40000000
+
+    def __init__(self, path: str, driver, model = None, shm: str = None, addr: int = None):
+        self.path = path
+        self.driver = driver
+        self.model = model
+        if addr is None:
+            addr = emu._addr
+            emu._addr += 0x100000
+
+        # map sizes are rounded up to whole pages
+        ctypes = [driver._regset_t]
+        if hasattr(driver, '_buffer_t'):
+            ctypes.append(driver._buffer_t)
+        sizes = [-(-sizeof(ctype) // mmap.PAGESIZE) * mmap.PAGESIZE for ctype in ctypes]
+        names = ('regset', 'buffer')
+        self.maps = tuple(_emu_map(index, names[index], addr + index * 0x10000, size) for index, size in enumerate(sizes))
+
+        # memory is backed by a file descriptor, so it can be mapped more than once
+        self.fds = []
+        self.mmaps = []
+        name = os.path.basename(path)
+        for uio_map in self.maps:
+            if shm is not None:
+                fd = os.open(os.path.join(shm, '{}.map{}'.format(name, uio_map.index)), os.O_RDWR | os.O_CREAT, 0o600)
+            else:
+                fd = os.memfd_create('{}.map{}'.format(name, uio_map.index))
+            os.ftruncate(fd, uio_map.size)
+            self.fds.append(fd)
+            self.mmaps.append(mmap.mmap(fd, uio_map.size, flags=mmap.MAP_SHARED, prot=mmap.PROT_READ | mmap.PROT_WRITE))
+
+        # interrupt is emulated by a socket pair
+        self.irq_dev, self.irq_hw = socket.socketpair()
+        self.irq_hw.setblocking(False)
+        self.irq_enabled = False
+        self.irq_count = 0
+
+        key = os.path.realpath(path)
+        if key in _uio_handle.backends:
+            raise ValueError("Device {} is already emulated.".format(path))
+        _uio_handle.backends[key] = lambda path, sysfs: _emu_handle(self, path, sysfs)
+        emu.devices[path] = self
+
+        self._stop = threading.Event()
+        self._thread = None
+        if model is not None:
+            model.attach(self)
+            self._thread = threading.Thread(target=model.run, args=(self._stop,), daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stop the model and remove the device from the backend registry."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.model is not None:
+            self.model.detach()
+        _uio_handle.backends.pop(os.path.realpath(self.path), None)
+        emu.devices.pop(self.path, None)
+        for uio_mmap in self.mmaps:
+            try:
+                uio_mmap.close()
+            except BufferError:
+                pass
+        for fd in self.fds:
+            os.close(fd)
+        self.irq_dev.close()
+        self.irq_hw.close()
+
+    def view(self, index: int, ctype):
+        """ctypes view of emulated map `index`, for models and tests."""
+        return ctype.from_buffer(self.mmaps[index])
+
+    def irq(self):
+        """Raise interrupt, if it is enabled.
+
+        Like with UIO, the interrupt is disabled after it is raised,
+        until it is enabled again by the user.
+        """
+        self._irq_update()
+        if self.irq_enabled:
+            self.irq_count += 1
+            self.irq_enabled = False
+            self.irq_hw.send(self.irq_count.to_bytes(4, byteorder=sys.byteorder))
+
+    def _irq_update(self):
+        # process interrupt enable/disable writes
+        while True:
+            try:
+                value = self.irq_hw.recv(4)
+            except BlockingIOError:
+                return
+            if not value:
+                return
+            self.irq_enabled = bool(int.from_bytes(value, byteorder=sys.byteorder))
+
+    @classmethod
+    def mercury(cls, osc_source = None, la_source = None, shm: str = None) -> dict:
+        """Install emulated devices for all Mercury FPGA modules.
+
+        Parameters
+        ----------
+        osc_source, la_source : callable, optional
+            Signal sources for the oscilloscope and logic analyzer models,
+            see :class:`acq_model`.
+        shm : str, optional
+            Directory (tmpfs) for map files.
+
+        Returns
+        -------
+        dict
+            Emulated devices by module name.
+        """
+        devices = {'hwid': (hwid, None),
+                   'mgmt': (mgmt, None),
+                   'pdm' : (pdm , None),
+                   'clb' : (clb , None),
+                   'gen0': (gen , None),
+                   'gen1': (gen , None),
+                   'osc0': (osc , osc_model(osc_source)),
+                   'osc1': (osc , osc_model(osc_source)),
+                   'lg'  : (lg  , None),
+                   'la'  : (la  , la_model(la_source))}
+        # event synchronization between models, indexes as in `mercury.sync_src`
+        peers = {}
+        for index, name in enumerate(('gen0', 'gen1', 'osc0', 'osc1', 'lg', 'la')):
+            model = devices[name][1]
+            if model is not None:
+                model.sync = index
+                model.peers = peers
+                peers[index] = model
+        devices = {name: cls('/dev/uio/'+name, driver, model, shm) for name, (driver, model) in devices.items()}
+        # all modules run from the same clock
+        epoch = time.monotonic()
+        for model in peers.values():
+            model.epoch = epoch
+        return devices
+
+    @classmethod
+    def close_all(cls):
+        """Remove all emulated devices."""
+        for device in list(cls.devices.values()):
+            device.close()
+
+
+class acq_model(object):
+    """Behavioural model of an acquisition module.
+
+    The model emulates:
+
+    * the `evn` state machine, commands written into `ctl_sts`
+      (reset, start, stop, software trigger) are executed
+      and the run/trigger status is written back,
+    * the `acq` pre and post trigger counters
+      (31 bit, wrapping like the hardware counters),
+    * filling the buffer with samples from `source`
+      at the sample rate given by the module decimation,
+    * an interrupt when the acquisition stops,
+    * software event synchronization (`cfg_evn`), a model selecting
+      another model as its event source executes its commands
+      at the same time instead of its own.
+
+    The model runs every `period` seconds and catches up
+    with real time. Commands written faster than the period
+    are merged, only the last one is seen. If the sample rate is
+    too high for real time generation, only the last buffer worth
+    of samples in each step is generated (older samples would be
+    overwritten anyway), hardware triggers are detected only
+    in generated samples.
+
+    Parameters
+    ----------
+    source : callable, optional
+        Function ``source(t)`` returning `int16` samples
+        for an array of times `t` in seconds.
+    period : float, optional
+        Model update period in seconds.
+    """
+    FS = 125000000.0
+
+    # status written by the model has the top bit set,
+    # so any command written by the driver is different
+    _STS_MODEL = 1<<31
+
+    #: event source index of this module (`sync_src`)
+    sync = None
+    #: models by event source index
+    peers = {}
+
+    def __init__(self, source = None, period: float = 50e-6):
+        self.source = self._source if source is None else source
+        self.period = period
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _source(t: np.ndarray) -> np.ndarray:
+        return np.zeros(len(t), dtype=np.int16)
+
+    def attach(self, device: emu):
+        self.device = device
+        self.regset = device.view(0, device.driver._regset_t)
+        self.buffer = np.ctypeslib.as_array(device.view(1, device.driver._buffer_t))
+        self.size = len(self.buffer)
+        self.epoch = time.monotonic()
+        self._reset()
+        self.status = 0
+
+    def detach(self):
+        del(self.regset, self.buffer)
+
+    def _reset(self):
+        self.running   = False
+        self.done      = False
+        self.triggered = False
+        self.software  = False
+        self.armed     = False
+        self.count     = 0  # samples since start
+        self.pre       = 0
+        self.pst       = 0
+        self.start     = 0.0
+
+    def run(self, stop: threading.Event):
+        while not stop.is_set():
+            self.step(time.monotonic())
+            time.sleep(self.period)
+
+    def step(self, now: float):
+        """Advance the model to time `now`."""
+        with self.lock:
+            regset = self.regset
+            ctl = regset.evn.ctl_sts
+            # commands are ignored if another model is the event source
+            leader = self.peers.get(regset.evn.cfg_evn, self)
+            if ctl != self.status and leader is self:
+                self._command(ctl, now)
+                for peer in self.peers.values():
+                    if peer is not self and hasattr(peer, 'regset') and peer.regset.evn.cfg_evn == self.sync:
+                        with peer.lock:
+                            peer._command(ctl, now)
+            if self.running:
+                n = int((now - self.start) * self.sample_rate) - self.count
+                if n > 0:
+                    self._acquire(n)
+            regset.acq.sts_pre = self.pre % 2**31
+            regset.acq.sts_pst = self.pst % 2**31
+            status = self._STS_MODEL
+            if self.running:   status |= evn._CTL_STR_MASK
+            if self.triggered: status |= evn._CTL_TRG_MASK
+            # do not overwrite a command written in the meantime
+            if regset.evn.ctl_sts == ctl:
+                regset.evn.ctl_sts = status
+            self.status = status
+            # interrupt is raised after the status is updated
+            if self.done:
+                self.done = False
+                self.device.irq()
+
+    def _command(self, ctl: int, now: float):
+        if ctl & evn._CTL_RST_MASK:
+            self._reset()
+        if ctl & evn._CTL_STR_MASK:
+            self._reset()
+            self.running = True
+            self.start = now
+        if ctl & evn._CTL_STP_MASK:
+            self.running = False
+        if ctl & evn._CTL_TRG_MASK and self.running:
+            self.software = True
+
+    @property
+    def decimation(self) -> int:
+        return self.regset.fil.cfg_dec + 1
+
+    @property
+    def sample_rate(self) -> float:
+        return self.FS / self.decimation
+
+    def _acquire(self, n: int):
+        if n > self.size:
+            # skip samples which can not be generated in real time
+            self._advance(n - self.size, None)
+            if not self.running:
+                # stopped while skipping, fill the buffer up to the last sample
+                first = max(self.count - self.size, 0)
+                self._store(self._samples(first, self.count - first), first)
+                return
+            n = self.size
+        first = self.count
+        x = self._samples(first, n)
+        m = self._advance(n, x)
+        self._store(x[:m], first)
+
+    def _samples(self, first: int, n: int) -> np.ndarray:
+        t = (self.start - self.epoch) + (first + np.arange(n)) / self.sample_rate
+        return self.source(t)
+
+    def _store(self, x: np.ndarray, first: int):
+        # store samples into the circular buffer
+        ptr = first % self.size
+        head = min(len(x), self.size - ptr)
+        self.buffer[ptr:ptr+head] = x[:head]
+        self.buffer[:len(x)-head] = x[head:]
+
+    def _advance(self, n: int, x: np.ndarray) -> int:
+        """Update counters for `n` samples, return number of samples consumed."""
+        regset = self.regset
+        i = 0
+        if not self.triggered:
+            # triggers are accepted after the pre trigger delay
+            wait = max(regset.acq.cfg_pre - self.pre, 0)
+            k = None
+            if self.software:
+                if wait < n:
+                    k = wait
+            elif x is not None and regset.evn.cfg_trg:
+                k = self._trigger(x, wait)
+            if k is None:
+                self.pre += n
+                self.count += n
+                return n
+            self.pre += k
+            self.triggered = True
+            i = k
+        m = min(n - i, regset.acq.cfg_pst - self.pst)
+        self.pst += m
+        i += m
+        self.count += i
+        if self.pst >= regset.acq.cfg_pst:
+            self.running = False
+            self.done = True
+        return i
+
+    def _trigger(self, x: np.ndarray, wait: int) -> int:
+        """Return index of the first hardware trigger event at or after `wait`."""
+        return None
+
+
+class osc_model(acq_model):
+    """Oscilloscope model with level/edge trigger.
+
+    For the positive edge, the trigger is armed when the signal
+    is below the negative level and fires when it rises above
+    the positive level (hysteresis), and the opposite for the negative edge.
+    """
+
+    @staticmethod
+    def _source(t: np.ndarray) -> np.ndarray:
+        # 1kHz sine at half of full scale
+        return (16384 * np.sin(2 * np.pi * 1e3 * t)).astype(np.int16)
+
+    def _trigger(self, x: np.ndarray, wait: int) -> int:
+        trg = self.regset.trg
+        if trg.cfg_edg == 0:
+            arm  = x <  trg.cfg_neg
+            fire = x >= trg.cfg_pos
+        else:
+            arm  = x >  trg.cfg_pos
+            fire = x <= trg.cfg_neg
+        if self.armed:
+            first = wait
+        else:
+            armed = np.flatnonzero(arm)
+            if not len(armed):
+                return None
+            first = max(armed[0] + 1, wait)
+        self.armed = True
+        fired = np.flatnonzero(fire[first:])
+        if not len(fired):
+            return None
+        self.armed = False
+        return first + fired[0]
+
+
+class la_model(acq_model):
+    """Logic analyzer model with comparator and edge trigger.
+
+    The trigger fires on samples matching ``(x & cfg_cmp_msk) == cfg_cmp_val``,
+    if edge masks are set, a selected bit must also change in the given direction.
+    """
+
+    @staticmethod
+    def _source(t: np.ndarray) -> np.ndarray:
+        # binary counter incremented every microsecond
+        return (t * 1e6).astype(np.int64).astype(np.uint16).view(np.int16)
+
+    @property
+    def decimation(self) -> int:
+        return self.regset.msk.cfg_dec + 1
+
+    def _trigger(self, x: np.ndarray, wait: int) -> int:
+        trg = self.regset.trg
+        x = x.view(np.uint16)
+        fire = (x & trg.cfg_cmp_msk) == trg.cfg_cmp_val
+        if trg.cfg_edg_pos or trg.cfg_edg_neg:
+            prev = np.empty_like(x)
+            prev[0] = getattr(self, 'last', x[0])
+            prev[1:] = x[:-1]
+            fire &= ((~prev & x & trg.cfg_edg_pos) | (prev & ~x & trg.cfg_edg_neg)) != 0
+        self.last = x[-1]
+        fired = np.flatnonzero(fire[wait:])
+        if not len(fired):
+            return None
+        return wait + fired[0]
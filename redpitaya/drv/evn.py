@@ -1,7 +1,13 @@
 from ctypes import *
+import time
 
 
 class evn():
+    # wait_done() polling: spin, then yield, then sleep with exponential backoff
+    _WAIT_SPIN  = 50e-6  # spin period [s]
+    _WAIT_YIELD = 1e-3   # yield period [s]
+    _WAIT_SLEEP = 100e-6 # initial sleep [s]
+    _WAIT_LIMIT = 10e-3  # sleep limit [s], increased for long acquisitions
     # control register masks
     _CTL_TRG_MASK = 1<<3  # sw trigger bit (sw trigger must be enabled)
     _CTL_STP_MASK = 1<<2  # stop/abort; returns 1 when stopped
@@ -54,6 +60,74 @@ class evn():
         """Trigger status."""
         return bool(self.regset.evn.ctl_sts & self._CTL_TRG_MASK)
 
+    def wait_done(self, timeout: float = None) -> bool:
+        """Wait for the state machine to stop running.
+
+        If the UIO device has an interrupt, the process sleeps
+        until the interrupt, otherwise the run status is polled,
+        first in a short spin loop, then yielding the CPU
+        and finally sleeping with an exponential backoff.
+        Sleeping is scaled to the expected acquisition time
+        (`capture_time`) if the module provides it.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Timeout in seconds, by default wait forever.
+
+        Returns
+        -------
+        bool
+            `True` if the state machine stopped,
+            `False` if the timeout expired.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        expected = getattr(self, 'capture_time', 0.0)
+        if self.irq_available:
+            return self._wait_irq(deadline, expected)
+        else:
+            return self._wait_poll(deadline, expected)
+
+    def _wait_irq(self, deadline: float, expected: float) -> bool:
+        # the status is checked after enabling the interrupt, so a stop
+        # before enabling is not missed, waiting is limited in case
+        # the module stopped without raising an interrupt
+        period = max(expected, self._WAIT_LIMIT)
+        while True:
+            self.irq_enable()
+            if not self.status_run():
+                return True
+            if deadline is None:
+                remaining = period
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+            if self.pool(min(remaining, period)):
+                self.irq_wait()
+
+    def _wait_poll(self, deadline: float, expected: float) -> bool:
+        start = time.monotonic()
+        # the acquisition can not end before all expected samples are stored
+        if expected > self._WAIT_SPIN:
+            time.sleep(expected if deadline is None else max(min(expected, deadline - start), 0))
+            start = time.monotonic()
+        delay = self._WAIT_SLEEP
+        limit = max(expected / 4, self._WAIT_LIMIT)
+        while self.status_run():
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                return False
+            elapsed = now - start
+            if elapsed < self._WAIT_SPIN:
+                continue
+            elif elapsed < self._WAIT_YIELD:
+                time.sleep(0)
+            else:
+                time.sleep(delay if deadline is None else min(delay, deadline - now))
+                delay = min(2 * delay, limit)
+        return True
+
     @property
     def sync_src(self) -> int:
         """Select for software event sources."""
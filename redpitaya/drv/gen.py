@@ -48,14 +48,10 @@ class gen(evn, asg_per, asg_bst, gen_out, wave, uio):
         # use index
         uio = uio+str(index)
 
-        # call parent class init to open UIO device and mmap maps
+        # call parent class init to open UIO device,
+        # regset and buffer are mapped on first access
         super().__init__(uio)
 
-        # map regset
-        self.regset = self._regset_t.from_buffer(self.uio_mmaps[0])
-        # map buffer
-        self.buffer = self._buffer_t.from_buffer(self.uio_mmaps[1])
-
         # calculate constants
         self.buffer_size = 2**self.CWM  #: buffer size
 
@@ -64,13 +60,14 @@ class gen(evn, asg_per, asg_bst, gen_out, wave, uio):
         self._f_max = self.FS / 2
         self._f_one = self.FS / 2**self.CWM
 
-    def __del__(self):
-        # disable output
-        self.enable = False
-        # make sure state machine is not running
-        self.reset()
-        # call parent class init to unmap maps and close UIO device
-        super().__del__()
+    def close(self):
+        if self.uio_handle is not None:
+            # disable output
+            self.enable = False
+            # make sure state machine is not running
+            self.reset()
+        # call parent class to release the UIO device
+        super().close()
 
     def default(self):
         """Set registers into default (power-up) state."""
@@ -38,14 +38,10 @@ class la(evn, acq, la_trg, la_rle, la_msk, uio):
         _type_   = c_int16
 
     def __init__(self, uio: str = '/dev/uio/la'):
-        # call parent class init to open UIO device and map regset
+        # call parent class init to open UIO device,
+        # regset and buffer are mapped on first access
         super().__init__(uio)
 
-        # map regset
-        self.regset = self._regset_t.from_buffer(self.uio_mmaps[0])
-        # map buffer
-        self.buffer = self._buffer_t.from_buffer(self.uio_mmaps[1])
-
     def __del__(self):
         # call parent class init to unmap maps and close UIO device
         super().__del__()
@@ -83,7 +79,7 @@ class la(evn, acq, la_trg, la_rle, la_msk, uio):
         adr = cnt % self.buffer_size
         return adr
 
-    def data(self, siz: int = buffer_size, ptr: int = None) -> np.array:
+    def data(self, siz: int = buffer_size, ptr: int = None) -> np.ndarray:
         """Data.
 
         Parameters
@@ -100,11 +96,15 @@ class la(evn, acq, la_trg, la_rle, la_msk, uio):
             Array containing binary samples.
             The data is alligned at the end to the last sample
             stored into the buffer.
+            If the buffer is double mapped (:attr:`buffer_mirror`),
+            this is a view into the FPGA buffer without a copy,
+            so it will change with the next acquisition.
         """
         if ptr is None:
             ptr = int(self.pointer)
-        adr = (self.buffer_size + ptr - siz) % self.buffer_size
-        ret = []
-        for i in range(siz):
-            ret.append(self.buffer[(i + ptr) % self.buffer_size])
-        return ret
+        mirror = self.buffer_mirror
+        if mirror is not None:
+            # the buffer is mapped twice, so the segment never wraps
+            return np.ctypeslib.as_array(mirror)[ptr:ptr+siz]
+        buffer_np = np.ctypeslib.as_array(self.buffer)
+        return np.take(buffer_np, range(ptr, ptr+siz), mode='wrap')
@@ -42,9 +42,9 @@ class la_msk(object):
     @property
     def decimation(self) -> int:
         """Decimation factor."""
-        return (self.regset.cfg_dec + 1)
+        return (self.regset.msk.cfg_dec + 1)
 
     @decimation.setter
     def decimation(self, value: int):
         # TODO check range
-        self.regset.cfg_dec = value - 1
+        self.regset.msk.cfg_dec = value - 1
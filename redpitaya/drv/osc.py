@@ -3,6 +3,7 @@ import numpy as np
 import math
 
 import mmap
+import time
 
 from .evn     import evn
 from .acq     import acq
@@ -26,6 +27,14 @@ class osc(evn, acq, osc_trg, osc_fil, uio):
     #: analog stage range voltages
     ranges = (1.0, 20.0)
 
+    # software calibration (gain, offset [V])
+    __calibration = (1.0, 0.0)
+    #: convert samples in :meth:`data` through :meth:`table`
+    #: instead of a multiplication, the lookup is slower on x86,
+    #: it can be enabled on platforms where measurements show it is faster
+    #: (see ``benchmarks/emu_capture.py``)
+    lookup = False
+
     class _regset_t(Structure):
         _fields_ = [('evn', evn._regset_t),
                     ('rsv_000', c_uint32),
@@ -46,14 +55,10 @@ class osc(evn, acq, osc_trg, osc_fil, uio):
         # use index
         uio = uio+str(index)
 
-        # call parent class init to open UIO device and map regset
+        # call parent class init to open UIO device,
+        # regset and buffer are mapped on first access
         super().__init__(uio)
 
-        # map regset
-        self.regset = self._regset_t.from_buffer(self.uio_mmaps[0])
-        # map buffer
-        self.buffer = self._buffer_t.from_buffer(self.uio_mmaps[1])
-
         # set input range (there is no default)
         self.input_range = input_range
 
@@ -88,10 +93,46 @@ class osc(evn, acq, osc_trg, osc_fil, uio):
     def input_range(self, value: float):
         if value in self.ranges:
             self.__input_range = value
+            self.__tables = {}
             self.filter_coeficients = self._filters[value]
         else:
             raise ValueError("Input range can be one of {} volts.".format(self.ranges))
 
+    @property
+    def calibration(self) -> tuple:
+        """Software calibration ``(gain, offset)`` applied to :meth:`data`.
+
+        Samples are converted into volts as
+        ``gain * sample * input_range / _DWr + offset``,
+        this corrects residual errors not covered by the FPGA
+        calibration (see :meth:`clb.calib_adc_residual`).
+        """
+        return self.__calibration
+
+    @calibration.setter
+    def calibration(self, value: tuple):
+        gain, offset = value
+        self.__calibration = (float(gain), float(offset))
+        self.__tables = {}
+
+    def table(self, dtype = np.float32) -> np.ndarray:
+        """Conversion table from binary samples into volts.
+
+        Used by :meth:`data` if :attr:`lookup` is enabled.
+        The table has an entry for each of the 65536 sample values,
+        indexed by the sample reinterpreted as `uint16`. Tables are
+        cached for each data type, they are rebuilt after a change of
+        :attr:`input_range` or :attr:`calibration`.
+        """
+        dtype = np.dtype(dtype)
+        table = self.__tables.get(dtype)
+        if table is None:
+            gain, offset = self.__calibration
+            codes = np.arange(2**16, dtype=np.uint16).view(np.int16)
+            table = (codes * (gain * self.__input_range / self._DWr) + offset).astype(dtype)
+            self.__tables[dtype] = table
+        return table
+
     @property
     def sample_rate(self) -> float:
         """Sample rate depending on decimation factor."""
@@ -110,7 +151,57 @@ class osc(evn, acq, osc_trg, osc_fil, uio):
         return adr
 
 
-    def data(self, siz: int = buffer_size, ptr: int = None) -> np.array:
+    def _segments(self, siz: int, ptr: int) -> tuple:
+        """Split `siz`-segment starting at `ptr` into (at most two) buffer views."""
+        mirror = self.buffer_mirror
+        if mirror is not None:
+            # the buffer is mapped twice, so the segment never wraps
+            return (np.ctypeslib.as_array(mirror)[ptr:ptr+siz],)
+        buffer_np = np.ctypeslib.as_array(self.buffer)
+        buffer_size = len(buffer_np)
+        # get `siz`-segment by start and exlusive-end pointers
+        start = ptr
+        end = (ptr + siz) % buffer_size
+        if start < end:
+            return (buffer_np[start:end],)
+        else:  # wrap around
+            return (buffer_np[start:], buffer_np[:end])
+
+    def raw(self, siz: int = buffer_size, ptr: int = None, out: np.ndarray = None) -> np.ndarray:
+        """Raw binary data.
+
+        Parameters
+        ----------
+        siz : int, optional
+            Number of data samples to be read from the FPGA buffer.
+        ptr : int, optional
+            End of data pointer, only use if you understand
+            the source code.
+        out : array, optional
+            Integer array of length `siz` the data is copied into.
+
+        Returns
+        -------
+        array
+            Array containing `int16` samples.
+            If `out` is not given and the buffer is double mapped
+            (:attr:`buffer_mirror`) or the segment does not wrap around
+            the buffer end, this is a view into the FPGA buffer
+            without a copy, so it will change with the next acquisition.
+        """
+        if ptr is None:
+            ptr = int(self.pointer)
+        segments = self._segments(siz, ptr)
+        if out is None:
+            if len(segments) == 1:
+                return segments[0]
+            out = np.empty(siz, dtype=segments[0].dtype)
+        elif len(out) != siz:
+            raise ValueError("Output array length should be {}.".format(siz))
+        np.concatenate(segments, out=out)
+        return out
+
+    def data(self, siz: int = buffer_size, ptr: int = None, out: np.ndarray = None, dtype = np.float64) -> np.ndarray:
         """Data.
 
         Parameters
@@ -120,30 +211,223 @@ class osc(evn, acq, osc_trg, osc_fil, uio):
         ptr : int, optional
             End of data pointer, only use if you understand
             the source code.
+        out : array, optional
+            Floating point array of length `siz` the data is written into,
+            reusing it avoids memory allocation on each call.
+        dtype : data-type, optional
+            Data type of the returned array if `out` is not given,
+            for example `np.float32`.
 
         Returns
         -------
         array
             Array containing float samples scaled
-            to the selected analog range.
+            to the selected analog range and calibrated,
+            see :attr:`calibration`.
             The data is alligned at the end to the last sample
             stored into the buffer.
         """
         if ptr is None:
             ptr = int(self.pointer)
-        scale = self.__input_range / float(self._DWr)
 
-        buffer_np = np.ctypeslib.as_array(self.buffer)
-        buffer_size = len(self.buffer)
+        if out is None:
+            out = np.empty(siz, dtype=dtype)
+        elif len(out) != siz:
+            raise ValueError("Output array length should be {}.".format(siz))
 
-        # get `siz`-segment by start and exlusive-end pointers
-        start = ptr
-        end = (ptr + siz) % buffer_size
-        if start < end:
-            return scale * buffer_np[start:end]
-        else:  # wrap around
-            head_length = buffer_size - start
-            segment = np.empty(head_length + end)
-            segment[:head_length] = buffer_np[start:]
-            segment[head_length:] = buffer_np[:end]
-            return scale * segment
+        # convert each segment straight into its place in the output array
+        if self.lookup:
+            table = self.table(out.dtype)
+        else:
+            gain, offset = self.__calibration
+            scale = out.dtype.type(gain * self.__input_range / self._DWr)
+            offset = out.dtype.type(offset)
+        index = 0
+        for segment in self._segments(siz, ptr):
+            part = out[index:index+len(segment)]
+            if self.lookup:
+                np.take(table, segment.view(np.uint16), out=part, mode='clip')
+            else:
+                np.multiply(segment, scale, out=part)
+                if offset:
+                    part += offset
+            index += len(segment)
+        return out
+
+    def stream(self, block: int = buffer_size // 4, depth: int = 4, raw: bool = False,
+               dtype = np.float64, strict: bool = False):
+        """Continuous acquisition generator.
+
+        The acquisition is reset and started without a trigger,
+        so the buffer is written continuously, the sum of pre and post
+        trigger counters is used as a free running write pointer.
+        It is extended from `CW` bits into a 64-bit sample index,
+        this requires the generator to be resumed at least once
+        every ``2**CW`` samples. The acquisition is stopped
+        when the generator is closed (for example on ``break``).
+        The stream ends if the acquisition stops, for example
+        after a trigger and post trigger delay.
+
+        An overrun happens if the reader falls more than a buffer behind
+        the write pointer, so samples were overwritten before they were read.
+        The stream then continues from the current write pointer,
+        overruns and lost samples are counted in :attr:`stream_overruns`
+        and :attr:`stream_lost`, the gap is also visible in the sample index.
+
+        Parameters
+        ----------
+        block : int, optional
+            Number of samples in each block, at most the buffer size.
+        depth : int, optional
+            Number of block arrays, they are reused round robin,
+            so a block is valid until `depth` further blocks are yielded.
+        raw : bool, optional
+            Yield binary `int16` samples instead of scaled ones.
+        dtype : data-type, optional
+            Data type of scaled samples.
+        strict : bool, optional
+            Raise :class:`OverflowError` on overrun.
+
+        Yields
+        ------
+        tuple
+            ``(index, array)`` where `index` is the 64-bit index
+            of the first sample in the block since the stream start.
+        """
+        if not (0 < block <= self.buffer_size):
+            raise ValueError("Block size should be in range [1,{}].".format(self.buffer_size))
+        if depth < 1:
+            raise ValueError("Queue depth should be positive.")
+        blocks = [np.empty(block, dtype=np.int16 if raw else dtype) for i in range(depth)]
+        self.stream_overruns = 0
+        self.stream_lost = 0
+
+        def counter() -> int:
+            return (self.trigger_pre_status + self.trigger_post_status) % self._CWr
+
+        self.reset()
+        # the write pointer must start from zero, wait for the reset
+        # to take effect (immediate on hardware, delayed in emulation)
+        timeout = time.monotonic() + 0.1
+        while counter() and time.monotonic() < timeout:
+            time.sleep(0)
+        self.start()
+        try:
+            # write and read sample indices
+            last = 0
+            write = 0
+            read = 0
+            n = 0
+            while True:
+                # extend write pointer into 64 bits
+                count = counter()
+                write += (count - last) % self._CWr
+                last = count
+                if write - read < block:
+                    if not self.status_run():
+                        return
+                    time.sleep((read + block - write) * self.sample_period)
+                    continue
+                out = blocks[n % depth]
+                if raw:
+                    self.raw(block, read % self.buffer_size, out=out)
+                else:
+                    self.data(block, read % self.buffer_size, out=out)
+                # the block is valid if it was not overwritten while reading
+                count = counter()
+                write += (count - last) % self._CWr
+                last = count
+                if write - read > self.buffer_size:
+                    lost = write - read
+                    self.stream_overruns += 1
+                    self.stream_lost += lost
+                    if strict:
+                        raise OverflowError("Stream overrun at sample {}, {} samples lost.".format(read, lost))
+                    read = write
+                    continue
+                yield read, out
+                read += block
+                n += 1
+        finally:
+            self.stop()
+
+    def acquire_segments(self, n: int, size: int, pre: int = 0, out: np.ndarray = None,
+                         timeout: float = None) -> np.ndarray:
+        """Segmented acquisition of `n` consecutive triggered records.
+
+        The acquisition is configured for `pre` samples before
+        and ``size - pre`` samples after the trigger. After each trigger
+        the segment is copied into its row of the output array
+        as binary `int16` samples and the acquisition is re-armed
+        immediately, without scaling or allocation in between.
+
+        Per segment host timestamps (:func:`time.monotonic` when the
+        acquisition was detected as done) and trigger pointers (buffer
+        address of the trigger sample) are stored in
+        :attr:`segment_timestamps` and :attr:`segment_pointers`.
+        The achieved trigger rate in Hz is stored in :attr:`segment_rate`,
+        and the mean dead time (from detecting a segment as done
+        until the acquisition is re-armed) in seconds in :attr:`segment_dead_time`.
+
+        Parameters
+        ----------
+        n : int
+            Number of segments.
+        size : int
+            Number of samples in each segment, at most the buffer size.
+        pre : int, optional
+            Number of samples before the trigger.
+        out : array, optional
+            Preallocated `int16` array of shape ``(n, size)``.
+        timeout : float, optional
+            Timeout for each segment in seconds, by default wait forever.
+
+        Returns
+        -------
+        array
+            Array of shape ``(n, size)`` containing `int16` samples,
+            use :attr:`input_range` / ``_DWr`` to scale them.
+
+        Raises
+        ------
+        TimeoutError
+            If a segment is not acquired within `timeout`,
+            segments acquired so far are valid.
+        """
+        if not (0 < size <= self.buffer_size):
+            raise ValueError("Segment size should be in range [1,{}].".format(self.buffer_size))
+        if not (0 <= pre <= size):
+            raise ValueError("Pre trigger size should be in range [0,{}].".format(size))
+        if out is None:
+            out = np.empty((n, size), dtype=np.int16)
+        elif out.shape != (n, size):
+            raise ValueError("Output array shape should be {}.".format((n, size)))
+        post = size - pre
+        self.trigger_pre = pre
+        self.trigger_post = post
+        self.segment_timestamps = np.zeros(n)
+        self.segment_pointers = np.zeros(n, dtype=np.int32)
+        self.segment_rate = 0.0
+        self.segment_dead_time = 0.0
+        dead = 0.0
+
+        self.reset()
+        self.start()
+        for i in range(n):
+            if not self.wait_done(timeout):
+                self.stop()
+                raise TimeoutError("Segment {} of {} was not acquired within {} s.".format(i, n, timeout))
+            done = time.monotonic()
+            ptr = self.pointer
+            self.raw(size, (ptr - size) % self.buffer_size, out=out[i])
+            if i < n - 1:
+                self.reset()
+                self.start()
+                dead += time.monotonic() - done
+            self.segment_timestamps[i] = done
+            self.segment_pointers[i] = (ptr - post) % self.buffer_size
+
+        if n > 1:
+            self.segment_rate = (n - 1) / (self.segment_timestamps[-1] - self.segment_timestamps[0])
+            self.segment_dead_time = dead / (n - 1)
+        return out
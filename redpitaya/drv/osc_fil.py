@@ -1,4 +1,5 @@
 from ctypes import *
+import math
 
 
 class osc_fil(object):
@@ -15,7 +15,6 @@ class pdm(uio):
 
     def __init__(self, uio: str = '/dev/uio/pdm'):
         super().__init__(uio)
-        self.regset = self._regset_t.from_buffer(self.uio_mmaps[0])
 
     def __del__(self):
         super().__del__()
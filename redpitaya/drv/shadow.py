@@ -0,0 +1,218 @@
+from ctypes import Structure, Array, c_uint32, memmove, addressof, sizeof
+
+
+class _shadow_array(object):
+    """Element access to a configuration array field of a :class:`shadow`.
+
+    Reads are served from the shadow (or staged) copy, writes go through
+    the same path as scalar configuration fields, so elements are written
+    into hardware (or staged and stored on commit).
+    """
+
+    def __init__(self, regset, name: str):
+        object.__setattr__(self, '_regset', regset)
+        object.__setattr__(self, '_name', name)
+
+    def _copy(self) -> Array:
+        regset = self._regset
+        return getattr(regset._ram if regset._stage is None else regset._stage, self._name)
+
+    def __len__(self):
+        return len(self._copy())
+
+    def __iter__(self):
+        return iter(self._copy()[:])
+
+    def __getitem__(self, index):
+        return self._copy()[index]
+
+    def __setitem__(self, index, value):
+        regset = self._regset
+        if isinstance(index, slice):
+            for i, v in zip(range(*index.indices(len(self))), value):
+                self[i] = v
+            return
+        if regset._stage is None:
+            getattr(regset._hw, self._name)[index] = value
+            getattr(regset._ram, self._name)[index] = value
+        else:
+            array = getattr(regset._stage, self._name)
+            array[index] = value
+            size = sizeof(array._type_)
+            start = regset._offset + getattr(type(regset._hw), self._name).offset + (index % len(array)) * size
+            regset._dirty.update(range(start & ~3, start + size, 4))
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class shadow(object):
+    """Register set with a write-through shadow of configuration registers.
+
+    Configuration fields (`cfg_*`) are written into both the hardware
+    register set and a copy of the same structure in RAM,
+    reads are served from RAM, so reading back a configuration value
+    does not cost a bus access. All other fields (`ctl_sts`, `sts_*`, arrays)
+    are accessed in hardware directly.
+
+    Configuration registers are only written by software, so the shadow
+    stays valid as long as all writes go through it, the UIO device lock
+    prevents other processes from accessing the device. Use :meth:`resync`
+    if the hardware was changed behind the shadow (for example by an
+    FPGA reload).
+
+    Between :meth:`begin` and :meth:`commit` field writes are staged
+    in a third copy of the structure, and reads of configuration fields
+    return staged values. On commit configuration words which changed
+    are stored into hardware in address order, followed by other writes
+    (control commands like reset/start) in the order they were issued.
+    Elements of configuration array fields are shadowed and staged
+    like scalar fields, elements of other array fields are written directly.
+    Nested structures are shadows themselves, an array of structures
+    (for example per channel registers) is a tuple of shadows.
+
+    Parameters
+    ----------
+    hw : :class:`ctypes.Structure`
+        Register set mapped over hardware.
+    ram : :class:`ctypes.Structure`, optional
+        Shadow copy, by default it is created and loaded from hardware.
+    """
+
+    def __init__(self, hw: Structure, ram: Structure = None, offset: int = 0, dirty: set = None, queue: list = None):
+        if ram is None:
+            ram = type(hw)()
+            memmove(addressof(ram), addressof(hw), sizeof(hw))
+        object.__setattr__(self, '_hw', hw)
+        object.__setattr__(self, '_ram', ram)
+        object.__setattr__(self, '_stage', None)
+        # byte offset within the top level register set
+        object.__setattr__(self, '_offset', offset)
+        # staged configuration word offsets and control writes [(offset, value)],
+        # shared with nested structures
+        object.__setattr__(self, '_dirty', set() if dirty is None else dirty)
+        object.__setattr__(self, '_queue', [] if queue is None else queue)
+        # nested shadows [(name, array index or None, shadow)]
+        object.__setattr__(self, '_nested', [])
+        # nested register structures (and arrays of them) are regular attributes,
+        # so they are found without calling __getattr__
+        for name, ctype in hw._fields_:
+            start = offset + getattr(type(hw), name).offset
+            if issubclass(ctype, Structure):
+                nested = type(self)(getattr(hw, name), getattr(ram, name), start, self._dirty, self._queue)
+                object.__setattr__(self, name, nested)
+                self._nested.append((name, None, nested))
+            elif issubclass(ctype, Array) and issubclass(ctype._type_, Structure):
+                size = sizeof(ctype._type_)
+                elements = tuple(type(self)(getattr(hw, name)[index], getattr(ram, name)[index],
+                                            start + index * size, self._dirty, self._queue)
+                                 for index in range(ctype._length_))
+                object.__setattr__(self, name, elements)
+                self._nested.extend((name, index, nested) for index, nested in enumerate(elements))
+
+    @staticmethod
+    def shadowed(name: str) -> bool:
+        """Check whether field `name` is read from the shadow."""
+        return name.startswith('cfg_')
+
+    def __getattr__(self, name: str):
+        if name.startswith('cfg_'):
+            value = getattr(self._ram if self._stage is None else self._stage, name)
+            if isinstance(value, Array):
+                # element writes must reach hardware, not only the copy
+                return _shadow_array(self, name)
+            return value
+        else:
+            return getattr(self._hw, name)
+
+    def __setattr__(self, name: str, value):
+        if self._stage is None:
+            setattr(self._hw, name, value)
+            if name.startswith('cfg_'):
+                setattr(self._ram, name, value)
+        else:
+            setattr(self._stage, name, value)
+            field = getattr(type(self._hw), name)
+            start = self._offset + field.offset
+            words = range(start & ~3, start + field.size, 4)
+            if name.startswith('cfg_'):
+                self._dirty.update(words)
+            else:
+                base = addressof(self._stage) - self._offset
+                for offset in words:
+                    self._queue.append((offset, c_uint32.from_address(base + offset).value))
+
+    def resync(self):
+        """Reload the shadow from hardware."""
+        memmove(addressof(self._ram), addressof(self._hw), sizeof(self._hw))
+
+    @property
+    def staged(self) -> bool:
+        """Whether writes are being staged."""
+        return self._stage is not None
+
+    def _attach(self, stage: Structure):
+        object.__setattr__(self, '_stage', stage)
+        for name, index, nested in self._nested:
+            if stage is None:
+                nested._attach(None)
+            elif index is None:
+                nested._attach(getattr(stage, name))
+            else:
+                nested._attach(getattr(stage, name)[index])
+
+    def begin(self):
+        """Start staging writes."""
+        if self._stage is not None:
+            raise ValueError("Register writes are already staged.")
+        stage = type(self._hw)()
+        memmove(addressof(stage), addressof(self._ram), sizeof(self._ram))
+        self._dirty.clear()
+        del self._queue[:]
+        self._attach(stage)
+
+    def commit(self) -> int:
+        """Write staged words into hardware.
+
+        Returns
+        -------
+        int
+            Number of words written.
+        """
+        return self.commit_config() + self.commit_control()
+
+    def commit_config(self) -> int:
+        """Write changed configuration words into hardware in address order and stop staging."""
+        stage = self._stage
+        self._attach(None)
+        words = sizeof(self._hw) // 4
+        hw    = (c_uint32 * words).from_address(addressof(self._hw))
+        ram   = (c_uint32 * words).from_address(addressof(self._ram))
+        new   = (c_uint32 * words).from_address(addressof(stage))
+        count = 0
+        for offset in sorted(self._dirty):
+            index = offset // 4
+            if new[index] != ram[index]:
+                hw[index] = ram[index] = new[index]
+                count += 1
+        self._dirty.clear()
+        return count
+
+    def commit_control(self) -> int:
+        """Write staged control words into hardware in issue order."""
+        words = sizeof(self._hw) // 4
+        hw    = (c_uint32 * words).from_address(addressof(self._hw))
+        for offset, value in self._queue:
+            hw[offset // 4] = value
+        count = len(self._queue)
+        del self._queue[:]
+        return count
+
+    def abort(self):
+        """Discard staged writes."""
+        self._attach(None)
+        self._dirty.clear()
+        del self._queue[:]
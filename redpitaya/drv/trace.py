@@ -0,0 +1,163 @@
+import time
+import collections
+from ctypes import Structure
+
+from .shadow import shadow
+
+
+class _trace_regset(object):
+    """Register set proxy recording each field access into a :class:`trace`."""
+    __slots__ = ('_regset', '_trace', '_module', '_prefix', '_nested')
+
+    def __init__(self, regset: Structure, trace, module: str, prefix: str = ''):
+        object.__setattr__(self, '_regset', regset)
+        object.__setattr__(self, '_trace', trace)
+        object.__setattr__(self, '_module', module)
+        object.__setattr__(self, '_prefix', prefix)
+        object.__setattr__(self, '_nested', {})
+
+    def __getattr__(self, name: str):
+        start = time.perf_counter_ns()
+        value = getattr(self._regset, name)
+        stop = time.perf_counter_ns()
+        if isinstance(value, (Structure, shadow)):
+            # nested register structure (evn, acq, trg, ...)
+            nested = self._nested.get(name)
+            if nested is None:
+                nested = _trace_regset(value, self._trace, self._module, self._prefix + name + '.')
+                self._nested[name] = nested
+            return nested
+        # reads served by the configuration shadow do not access hardware
+        op = 'c' if isinstance(self._regset, shadow) and shadow.shadowed(name) else 'r'
+        self._trace.record(op, self._module, self._prefix + name, value, start, stop)
+        return value
+
+    def __setattr__(self, name: str, value):
+        start = time.perf_counter_ns()
+        setattr(self._regset, name, value)
+        stop = time.perf_counter_ns()
+        self._trace.record('w', self._module, self._prefix + name, value, start, stop)
+
+
+class trace(object):
+    """Register access tracer.
+
+    While a driver is attached, its `regset` is replaced by a proxy
+    which counts hardware reads, writes and reads served by the
+    configuration :class:`shadow` for each register field,
+    collects access latency histograms and records the sequence
+    of accesses. Detached drivers access registers directly,
+    so tracing costs nothing when it is not used::
+
+        with trace([osc0]) as t:
+            osc0.pointer
+        t.report()
+
+    Parameters
+    ----------
+    devices : iterable of :class:`uio`, optional
+        Drivers to attach.
+    depth : int, optional
+        Number of accesses kept in the access log.
+
+    Attributes
+    ----------
+    counters : dict
+        ``{(module, field): [reads, writes, cached]}``
+    histograms : dict
+        ``{(module, field): list}`` where element `i` counts accesses
+        with latency in range ``[2**(i-1), 2**i)`` nanoseconds.
+    log : :class:`collections.deque`
+        Last accesses as ``(time_ns, op, module, field, value)``,
+        where `op` is 'r' (read), 'w' (write) or 'c' (cached read).
+    """
+    #: number of latency histogram bins
+    bins = 32
+
+    def __init__(self, devices: tuple = (), depth: int = 4096):
+        self.log = collections.deque(maxlen=depth)
+        self.attached = {}
+        self.reset()
+        self._devices = devices
+
+    def __enter__(self):
+        for dev in self._devices:
+            self.attach(dev)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.detach()
+
+    def reset(self):
+        """Clear counters, histograms and log."""
+        self.counters = collections.defaultdict(lambda: [0, 0, 0])
+        self.histograms = collections.defaultdict(lambda: [0] * self.bins)
+        self.log.clear()
+
+    def attach(self, dev, module: str = None):
+        """Start tracing register accesses of driver `dev`.
+
+        Parameters
+        ----------
+        dev : :class:`uio`
+            Driver instance.
+        module : str, optional
+            Module name used in counters,
+            by default the device node name (for example `osc0`).
+        """
+        if module is None:
+            module = dev.uio_path.rsplit('/', 1)[-1]
+        regset = dev.regset
+        if isinstance(regset, _trace_regset):
+            raise ValueError("Driver {} is already traced.".format(module))
+        self.attached[id(dev)] = (dev, regset)
+        dev.__dict__['regset'] = _trace_regset(regset, self, module)
+
+    def detach(self, dev = None):
+        """Stop tracing driver `dev`, or all attached drivers."""
+        devices = list(self.attached) if dev is None else [id(dev)]
+        for key in devices:
+            dev, regset = self.attached.pop(key)
+            dev.__dict__['regset'] = regset
+
+    def record(self, op: str, module: str, field: str, value, start: int, stop: int):
+        self.counters[(module, field)]['rwc'.index(op)] += 1
+        self.histograms[(module, field)][min((stop - start).bit_length(), self.bins - 1)] += 1
+        self.log.append((start, op, module, field, value))
+
+    @property
+    def reads(self) -> int:
+        """Total number of hardware register reads."""
+        return sum(reads for reads, writes, cached in self.counters.values())
+
+    @property
+    def writes(self) -> int:
+        """Total number of register writes."""
+        return sum(writes for reads, writes, cached in self.counters.values())
+
+    @property
+    def cached(self) -> int:
+        """Total number of register reads served by the shadow."""
+        return sum(cached for reads, writes, cached in self.counters.values())
+
+    def report(self):
+        """Print access counters and median latency (histogram bin upper bound), most accessed fields first."""
+        print("{:8s} {:16s} {:>8s} {:>8s} {:>8s} {:>10s}".format('module', 'field', 'reads', 'writes', 'cached', 'median[ns]'))
+        for key, (reads, writes, cached) in sorted(self.counters.items(), key=lambda item: -sum(item[1])):
+            histogram = self.histograms[key]
+            half = (reads + writes + cached + 1) // 2
+            total = 0
+            for i, count in enumerate(histogram):
+                total += count
+                if total >= half:
+                    break
+            print("{:8s} {:16s} {:8d} {:8d} {:8d} {:10d}".format(key[0], key[1], reads, writes, cached, 1 << i))
+
+    def dump(self):
+        """Print the access log, times are relative to the first logged access."""
+        if not self.log:
+            return
+        start = self.log[0][0]
+        for time_ns, op, module, field, value in self.log:
+            value = "0x{:08x}".format(value & 0xffffffff) if isinstance(value, int) else repr(value)
+            print("{:12.3f}us {} {:8s} {:16s} {}".format((time_ns - start) / 1000, op, module, field, value))
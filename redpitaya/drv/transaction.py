@@ -0,0 +1,71 @@
+from .shadow import shadow
+
+
+class transaction(object):
+    """Batched register writes over one or more drivers.
+
+    Inside the context register writes are staged in RAM.
+    On exit changed configuration words are stored into hardware
+    in address order, device after device sorted by physical address,
+    followed by control writes (reset, start, trigger, ...) of each
+    device in the order they were issued, so devices are started
+    only after all of them are configured. If the context exits
+    with an exception, staged writes are discarded.
+    Device locks are held for the duration of the transaction::
+
+        with transaction(osc0, osc1):
+            osc0.decimation = 4
+            osc1.decimation = 4
+            osc0.start()
+            osc1.start()
+
+    Transactions can be nested, writes are stored by the outermost one.
+
+    Parameters
+    ----------
+    devices : :class:`uio`
+        Drivers with a register set.
+
+    Attributes
+    ----------
+    count : int
+        Number of words written on the last commit.
+    """
+
+    def __init__(self, *devices):
+        handles = {id(dev.uio_handle): dev for dev in devices}
+        self.devices = sorted(handles.values(), key=lambda dev: dev.uio_maps[0].addr)
+        self.count = 0
+
+    def __enter__(self):
+        self.count = 0
+        self.shadows = []
+        self.locks = []
+        try:
+            for dev in self.devices:
+                dev.uio_lock.acquire()
+                self.locks.append(dev.uio_lock)
+                regset = dev.uio_handle.view(0, dev._regset_t, shadow)
+                if not regset.staged:
+                    regset.begin()
+                    self.shadows.append(regset)
+        except BaseException as e:
+            self.__exit__(type(e), e, e.__traceback__)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                for regset in self.shadows:
+                    self.count += regset.commit_config()
+                for regset in self.shadows:
+                    self.count += regset.commit_control()
+        finally:
+            for regset in self.shadows:
+                if regset.staged:
+                    regset.abort()
+            for lock in reversed(self.locks):
+                lock.release()
+            self.shadows = []
+            self.locks = []
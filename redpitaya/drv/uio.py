@@ -1,17 +1,278 @@
 import os
+import sys
 import fcntl
 import mmap
-import pyudev
-from ctypes import c_uint32
+import select
+import asyncio
+import functools
+import threading
+import weakref
+import ctypes
+from ctypes import c_uint32, c_void_p, c_size_t, c_int, c_long
+
+from .shadow import shadow
+from .transaction import transaction
 
 
 class _uio_map(object):
-    def __init__(self, device, index: int):
+    def __init__(self, path: str, index: int):
         self.index  = index
-        self.name   =     device.attributes.asstring('maps/map'+str(index)+'/name')
-        self.addr   = int(device.attributes.asstring('maps/map'+str(index)+'/addr'), 16)
-        self.offset = int(device.attributes.asstring('maps/map'+str(index)+'/offset'), 16)
-        self.size   = int(device.attributes.asstring('maps/map'+str(index)+'/size'), 16)
+        self.name   =     self._attribute(path, 'name')
+        self.addr   = int(self._attribute(path, 'addr'), 16)
+        self.offset = int(self._attribute(path, 'offset'), 16)
+        self.size   = int(self._attribute(path, 'size'), 16)
+
+    def _attribute(self, path: str, name: str) -> str:
+        with open(os.path.join(path, 'map'+str(self.index), name), 'r') as attribute:
+            return attribute.read().strip()
+
+
+@functools.lru_cache(maxsize=None)
+def _uio_maps(sysfs: str, device: str) -> tuple:
+    """Read map descriptors from sysfs, the result is cached for the life of the process.
+
+    Parameters
+    ----------
+    sysfs : str
+        UIO class path in sysfs.
+    device : str
+        Kernel device name (for example `uio3`).
+    """
+    path = os.path.join(sysfs, device, 'maps')
+    return tuple(sorted((_uio_map(path, int(uio_map[3:])) for uio_map in os.listdir(path)), key=lambda uio_map: uio_map.index))
+
+
+@functools.lru_cache(maxsize=None)
+def _uio_irq(sysfs: str, device: str) -> bool:
+    """Check the device tree node of a UIO device for an interrupt, the result is cached.
+
+    Parameters
+    ----------
+    sysfs : str
+        UIO class path in sysfs.
+    device : str
+        Kernel device name (for example `uio3`).
+    """
+    path = os.path.join(sysfs, device, 'device', 'of_node')
+    return any(os.path.exists(os.path.join(path, name)) for name in ('interrupts', 'interrupts-extended'))
+
+
+class _uio_view(object):
+    """Lazy ctypes view of a UIO map.
+
+    On first access the map is `mmap`ed and the ctypes type
+    is placed over it, optionally wrapped (for example into a
+    :class:`shadow`). The view is then stored in the instance
+    dictionary, where it shadows this descriptor, so further
+    access costs the same as for a plain attribute.
+    """
+    def __init__(self, index: int, ctype: str, wrapper = None):
+        self.index = index
+        self.ctype = ctype
+        self.wrapper = wrapper
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner = None):
+        if instance is None:
+            return self
+        if instance.uio_handle is None:
+            raise ValueError("UIO device {} is closed.".format(instance.uio_path))
+        view = instance.uio_handle.view(self.index, getattr(instance, self.ctype), self.wrapper)
+        instance.__dict__[self.name] = view
+        return view
+
+
+class _uio_mirror(_uio_view):
+    """Lazy ctypes view of a UIO map mapped twice back to back.
+
+    The value is `None` if the double mapping is not available.
+    """
+    def __get__(self, instance, owner = None):
+        if instance is None:
+            return self
+        if instance.uio_handle is None:
+            raise ValueError("UIO device {} is closed.".format(instance.uio_path))
+        view = instance.uio_handle.mirror(self.index, getattr(instance, self.ctype))
+        instance.__dict__[self.name] = view
+        return view
+
+
+# libc `mmap` is used for mappings at a fixed address,
+# which are not supported by the `mmap` module
+_libc = ctypes.CDLL(None, use_errno=True)
+_libc.mmap.restype  = c_void_p
+_libc.mmap.argtypes = (c_void_p, c_size_t, c_int, c_int, c_int, c_long)
+_libc.munmap.restype  = c_int
+_libc.munmap.argtypes = (c_void_p, c_size_t)
+_PROT_NONE  = 0x0
+_MAP_FIXED  = 0x10
+_MAP_FAILED = c_void_p(-1).value
+
+
+class _uio_handle(object):
+    """Shared UIO device handle.
+
+    A single handle exists for each device node in a process,
+    it owns the open device file, the exclusive lock, the `mmap`s
+    and the ctypes views placed over them. Handles are reference counted,
+    they are obtained with :meth:`acquire` and returned with :meth:`release`,
+    the device is closed when the last user releases it.
+
+    Device nodes listed in :attr:`backends` are opened with the given
+    handle factory instead, this is used for emulated devices (see :mod:`emu`).
+    """
+    _handles = {}
+    # reentrant, drivers garbage collected while the registry is locked release their handles
+    _registry_lock = threading.RLock()
+
+    #: alternative handle factories ``factory(path, sysfs)`` by device node path
+    backends = {}
+
+    def __init__(self, path: str, sysfs: str):
+        self.path = path
+        self.key = os.path.realpath(path)
+        self.refs = 0
+        #: lock for users sharing the device
+        self.lock = threading.RLock()
+
+        # open device file
+        try:
+            self.dev = open(self.path, 'r+b')
+        except OSError as e:
+            raise IOError(e.errno, "Opening {}: {}".format(self.path, e.strerror))
+
+        # exclusive lock
+        try:
+            fcntl.flock(self.dev, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError as e:
+            self.dev.close()
+            raise IOError(e.errno, "Locking {}: {}".format(self.path, e.strerror))
+
+        # create list of UIO maps, the device node (`/dev/uio/<name>`)
+        # is a symbolic link to the kernel device (`/dev/uioN`)
+        try:
+            self.maps = _uio_maps(sysfs, os.path.basename(self.key))
+        except OSError as e:
+            self.dev.close()
+            raise IOError(e.errno, "Reading maps {}: {}".format(self.path, e.strerror))
+
+        # interrupt support from the device tree node, without enabling it
+        self.irq = _uio_irq(sysfs, os.path.basename(self.key))
+
+        # maps listed in device tree are mmap-ed on demand
+        self.mmaps = [None] * len(self.maps)
+        self.views = {}
+        self.mirrors = {}
+
+    @classmethod
+    def acquire(cls, path: str, sysfs: str):
+        """Return the shared handle for device node `path`, open it if necessary."""
+        key = os.path.realpath(path)
+        with cls._registry_lock:
+            handle = cls._handles.get(key)
+            if handle is None:
+                handle = cls.backends.get(key, cls)(path, sysfs)
+                cls._handles[key] = handle
+            handle.refs += 1
+        return handle
+
+    def release(self):
+        """Drop a reference, close the device when it was the last one."""
+        # the handle stays registered until the device is closed, so a concurrent
+        # `acquire` does not open the device while it is still locked by this handle
+        with self._registry_lock:
+            self.refs -= 1
+            if self.refs > 0:
+                return
+            try:
+                self.close()
+            finally:
+                del(self._handles[self.key])
+
+    def mmap(self, index: int) -> mmap.mmap:
+        """Return map at `index`, `mmap` it on first use."""
+        with self.lock:
+            if self.mmaps[index] is None:
+                uio_map = self.maps[index]
+                try:
+                    self.mmaps[index] = mmap.mmap(fileno = self.dev.fileno(),
+                                                  length = uio_map.size,
+                                                  offset = uio_map.index * mmap.PAGESIZE,
+                                                  flags  = mmap.MAP_SHARED,
+                                                  prot   = mmap.PROT_READ | mmap.PROT_WRITE)
+                except OSError as e:
+                    raise IOError(e.errno, "Mapping {} map {} size {}: {}".format(self.path, uio_map.name, uio_map.size, e.strerror))
+            return self.mmaps[index]
+
+    def source(self, index: int) -> tuple:
+        """Return file descriptor and offset to `mmap` map at `index` from."""
+        return self.dev.fileno(), self.maps[index].index * mmap.PAGESIZE
+
+    def mirror(self, index: int, ctype):
+        """Return a view over map at `index` mapped twice back to back.
+
+        The returned ctypes array has twice the length of `ctype`,
+        element `i + len(ctype)` is the same memory as element `i`,
+        so any circular window over the map is a contiguous slice.
+        Returns `None` if the map size is not a multiple of the page size,
+        or if the double mapping fails.
+        """
+        with self.lock:
+            if (index, ctype) in self.mirrors:
+                return self.mirrors[(index, ctype)]
+            size = ctypes.sizeof(ctype)
+            fd, offset = self.source(index)
+            view = None
+            if size % mmap.PAGESIZE == 0:
+                # reserve address space for both copies, then map the file over it
+                base = _libc.mmap(None, 2 * size, _PROT_NONE, mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS, -1, 0)
+                if base not in (None, _MAP_FAILED):
+                    prot = mmap.PROT_READ | mmap.PROT_WRITE
+                    flags = mmap.MAP_SHARED | _MAP_FIXED
+                    if (_libc.mmap(base,        size, prot, flags, fd, offset) == base and
+                        _libc.mmap(base + size, size, prot, flags, fd, offset) == base + size):
+                        view = (ctype._type_ * (2 * ctype._length_)).from_address(base)
+                        # unmap when the last user of the view is gone
+                        weakref.finalize(view, _libc.munmap, base, 2 * size)
+                    else:
+                        _libc.munmap(base, 2 * size)
+            self.mirrors[(index, ctype)] = view
+            return view
+
+    def view(self, index: int, ctype, wrapper = None):
+        """Return ctypes `ctype` view over map at `index`, shared by all users.
+
+        If `wrapper` is given, the view is wrapped as ``wrapper(view)``.
+        """
+        with self.lock:
+            view = self.views.get((index, ctype, wrapper))
+            if view is None:
+                view = ctype.from_buffer(self.mmap(index))
+                if wrapper is not None:
+                    view = wrapper(view)
+                self.views[(index, ctype, wrapper)] = view
+            return view
+
+    def close(self):
+        # drop views, so the maps are no longer exported
+        self.views = {}
+        self.mirrors = {}
+        # close memory mappings, a map still exported by a view held
+        # elsewhere is unmapped when the view is garbage collected
+        for index, uio_mmap in enumerate(self.mmaps):
+            if uio_mmap is not None:
+                try:
+                    uio_mmap.close()
+                except BufferError:
+                    pass
+                self.mmaps[index] = None
+        # close uio device (also releases exclusive lock)
+        try:
+            self.dev.close()
+        except OSError as e:
+            raise IOError(e.errno, "Closing {}: {}".format(self.path, e.strerror))
 
 
 class uio(object):
@@ -26,10 +287,26 @@ class uio(object):
        applications from accessing the same HW module.
     3. If locking is sucessfull sysfs arguments will be read
        to determine the maps listed in the device tree.
-       All maps will be `mmap`ed into memory and provided
-       as a tuple.
+       Map descriptors are read directly from `/sys/class/uio/uioN/maps/`
+       and cached per device for the life of the process.
+
+    The open file, lock and maps are kept in a process wide registry
+    of reference counted handles, so all instances for the same device
+    node (for example calibration objects created by each channel)
+    share one file descriptor, one set of maps and one lock.
 
-    When an instance of :class:`uio` is deleted the next steps are performed:
+    Maps are `mmap`ed lazily, the register set (map 0) on first access
+    to :attr:`regset`, and the buffer (map 1) on first access to :attr:`buffer`.
+    Use :meth:`prefetch` to map everything in advance.
+
+    The register set keeps a write-through :class:`shadow` of
+    configuration registers (`cfg_*`), so reading them does not access
+    the hardware, status registers are always read from hardware.
+    The shadow is shared by all instances of the same device.
+
+    When an instance of :class:`uio` is closed (:meth:`close`,
+    leaving a ``with`` block, or deletion) the reference to the
+    shared handle is released. When the last reference is released:
 
     1. Close all memory mappings.
     2. Close the UIO device file, which also releases the exclusive lock.
@@ -41,64 +318,113 @@ class uio(object):
 
     Attributes
     ----------
-    uio_maps : :obj:`touple` of :class:`mmap` objects
+    uio_maps : :obj:`touple` of :class:`_uio_map` objects
         List of all memory maps derived from device tree node for the UIO device.
-    uio_mmaps : :obj:`touple` of :class:`mmap` objects
-        List of all mmap-ed memory maps derived from device tree node for the UIO device.
+    uio_mmaps : :obj:`list` of :class:`mmap` objects
+        List of all mmap-ed memory maps derived from device tree node for the UIO device,
+        maps which were not accessed yet are `None`.
+    regset : :class:`shadow`
+        Register set structure (`_regset_t`) over map 0,
+        with a shadow of configuration registers.
+    buffer : :class:`ctypes.Array`
+        Buffer array (`_buffer_t`) over map 1.
+    buffer_mirror : :class:`ctypes.Array`
+        Buffer map 1 mapped twice back to back, an array of twice
+        the `_buffer_t` length where any circular window is contiguous,
+        `None` if double mapping is not available.
+    uio_lock : :class:`threading.RLock`
+        Lock shared by all instances of the same device,
+        use it to make a sequence of register accesses atomic between threads.
+    irq_count : int
+        Last interrupt counter value read from the device, `None` before the first interrupt.
+    irq_handled : int
+        Number of interrupts handled by this instance.
+    irq_missed : int
+        Number of interrupts which happened but were not handled,
+        detected from gaps in the interrupt counter.
     """
 
+    regset = _uio_view(0, '_regset_t', shadow)
+    buffer = _uio_view(1, '_buffer_t')
+    buffer_mirror = _uio_mirror(1, '_buffer_t')
+
+    #: UIO class path in sysfs
+    sysfs = '/sys/class/uio'
+
+    uio_handle = None
+
+    irq_count   = None
+    irq_handled = 0
+    irq_missed  = 0
+
     def __init__(self, uio: str):
         # store UIO device node path
         self.uio_path = uio
 
-        # open device file
-        try:
-            self.uio_dev = open(self.uio_path, 'r+b')
-        except OSError as e:
-            raise IOError(e.errno, "Opening {}: {}".format(self.uio_path, e.strerror))
+        # open device file, or share an already open one
+        self.uio_handle = _uio_handle.acquire(self.uio_path, self.sysfs)
+        self.uio_dev   = self.uio_handle.dev
+        self.uio_lock  = self.uio_handle.lock
+        self.uio_maps  = self.uio_handle.maps
+        self.uio_mmaps = self.uio_handle.mmaps
 
-        # exclusive lock
-        try:
-            fcntl.flock(self.uio_dev, fcntl.LOCK_EX | fcntl.LOCK_NB)
-        except IOError as e:
-            raise IOError(e.errno, "Locking {}: {}".format(self.uio_path, e.strerror))
+    def __del__(self):
+        self.close()
 
-        # UDEV device
-        device = pyudev.Devices.from_device_file(pyudev.Context(), self.uio_path)
+    def __enter__(self):
+        return self
 
-        # create list of UIO maps
-        self.uio_maps = [_uio_map(device, int(uio_map[3:])) for uio_map in os.listdir(os.path.join(device.sys_path, 'maps'))]
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
-        # mmap all maps listed in device tree
-        self.uio_mmaps = [self._uio_mmap(uio_map) for uio_map in self.uio_maps]
+    def close(self):
+        """Release the shared device handle.
 
-    def _uio_mmap(self, uio_map: _uio_map):
-        try:
-            uio_mmap = mmap.mmap(fileno = self.uio_dev.fileno(),
-                                 length = uio_map.size,
-                                 offset = uio_map.index * mmap.PAGESIZE,
-                                 flags  = mmap.MAP_SHARED,
-                                 prot   = mmap.PROT_READ | mmap.PROT_WRITE)
-        except OSError as e:
-            raise IOError(e.errno, "Mapping {} map {} size {}: {}".format(self.uio_path, uio_map.name, uio_map.size, e.strerror))
-        return uio_mmap
+        Views (:attr:`regset`, :attr:`buffer`) obtained
+        from this instance should not be used afterwards.
+        Closing an already closed instance has no effect.
+        """
+        if self.uio_handle is None:
+            return
+        self.__dict__.pop('regset', None)
+        self.__dict__.pop('buffer', None)
+        self.__dict__.pop('buffer_mirror', None)
+        handle, self.uio_handle = self.uio_handle, None
+        handle.release()
 
-    def __del__(self):
-        # print('UIO __del__ was activated.')
-        # close memory mappings
-        for uio_mmap in self.uio_mmaps:
-            uio_mmap.close()
-        # close uio device (also releases exclusive lock)
-        try:
-            self.uio_dev.close()
-        except OSError as e:
-            raise IOError(e.errno, "Closing {}: {}".format(self.uio_path, e.strerror))
+    def uio_mmap(self, index: int) -> mmap.mmap:
+        """Return map at `index`, `mmap` it on first use."""
+        return self.uio_handle.mmap(index)
+
+    def prefetch(self):
+        """Map all maps and views in advance.
+
+        Use this before latency sensitive code,
+        to avoid the mapping cost on first access.
+        """
+        for index in range(len(self.uio_maps)):
+            self.uio_mmap(index)
+        for name in ('regset', 'buffer', 'buffer_mirror'):
+            view = getattr(type(self), name)
+            if hasattr(self, view.ctype) and view.index < len(self.uio_maps):
+                getattr(self, name)
+
+    def resync(self):
+        """Reload the configuration register shadow from hardware."""
+        self.uio_handle.view(0, self._regset_t, shadow).resync()
+
+    def transaction(self) -> transaction:
+        """Return a :class:`transaction` staging register writes of this driver.
+
+        Use :class:`transaction` directly to combine several drivers.
+        """
+        return transaction(self)
 
     def irq_enable(self):
         """Enable interrupt."""
         cnt = c_uint32(1);
         try:
-            self.uio_dev.write(bytearray(cnt))
+            os.write(self.uio_dev.fileno(), bytes(cnt))
         except OSError as e:
             raise IOError(e.errno, "Enable IRQ {}: {}".format(self.uio_path, e.strerror));
 
@@ -106,20 +432,106 @@ class uio(object):
         """Disable interrupt."""
         cnt = c_uint32(0);
         try:
-            self.uio_dev.write(bytearray(cnt))
+            os.write(self.uio_dev.fileno(), bytes(cnt))
         except OSError as e:
             raise IOError(e.errno, "Disable IRQ {}: {}".format(self.uio_path, e.strerror));
 
-    def irq_wait(self):
-        """Wait for interrupt."""
+    def irq_wait(self) -> int:
+        """Wait for interrupt.
+
+        Returns
+        -------
+        int
+            Interrupt counter (total number of interrupts since boot).
+        """
+        return self._irq_read()
+
+    def _irq_read(self) -> int:
+        """Read the interrupt counter and update interrupt statistics."""
         try:
-            status = self.uio_dev.read(4)
+            status = os.read(self.uio_dev.fileno(), 4)
         except OSError as e:
             raise IOError(e.errno, "Wait for IRQ {}: {}".format(self.uio_path, e.strerror));
-        # import sys
-        # cnt = int.from_bytes(status, byteorder=sys.byteorder)
+        cnt = int.from_bytes(status, byteorder=sys.byteorder)
+        # the counter is incremented by the kernel for each interrupt,
+        # a difference larger than one means interrupts were missed
+        if self.irq_count is not None:
+            self.irq_missed += max(((cnt - self.irq_count) & 0xffffffff) - 1, 0)
+        self.irq_count = cnt
+        self.irq_handled += 1
+        return cnt
+
+    async def irq(self) -> int:
+        """Wait for interrupt inside an `asyncio` event loop.
+
+        The interrupt is enabled with :meth:`irq_enable`,
+        then the device file is registered with the running event loop
+        and the coroutine is suspended until the file becomes readable.
+        No thread is blocked while waiting, so a single event loop
+        can wait for any number of devices.
+
+        Returns
+        -------
+        int
+            Interrupt counter (total number of interrupts since boot).
+        """
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        fd = self.uio_dev.fileno()
+
+        def _ready():
+            if not ready.done():
+                ready.set_result(None)
+
+        loop.add_reader(fd, _ready)
+        try:
+            self.irq_enable()
+            await ready
+        finally:
+            loop.remove_reader(fd)
+        return self._irq_read()
+
+    async def irq_events(self):
+        """Asynchronous iterator over interrupt events.
+
+        Each iteration re-enables the interrupt and waits for the next one::
+
+            async for cnt in osc.irq_events():
+                print(osc.data())
+
+        Yields
+        ------
+        int
+            Interrupt counter.
+        """
+        while True:
+            yield await self.irq()
+
+    @property
+    def irq_available(self) -> bool:
+        """Interrupt support.
+
+        Read from the device tree node of the UIO device
+        (``interrupts`` property) when the device is opened,
+        the interrupt is not enabled by checking it.
+        """
+        return self.uio_handle.irq
+
+    def pool(self, timeout: float = 0) -> bool:
+        """Check for a pending interrupt.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Time in seconds to wait for the interrupt,
+            by default return immediately, `None` waits forever.
 
-    def pool(self):
-        """TODO: implement interrupt support
+        Returns
+        -------
+        bool
+            `True` if an interrupt is pending,
+            it can be read with :meth:`irq_wait` without blocking.
         """
-        pass
+        poll = select.poll()
+        poll.register(self.uio_dev.fileno(), select.POLLIN)
+        return bool(poll.poll(None if timeout is None else timeout * 1000))
@@ -0,0 +1,107 @@
+import select
+
+from .uio import uio
+
+
+class uio_mux(object):
+    """Interrupt multiplexer for UIO devices.
+
+    All registered device files are placed into a single `epoll` set,
+    so one thread can wait for whichever device interrupts first,
+    instead of polling each module status in turn::
+
+        mux = uio_mux([osc0, osc1, la])
+        for dev in mux.wait(timeout=1.0):
+            print(dev.uio_path, dev.data())
+
+    After an interrupt is read, the device interrupt counter is updated
+    (see :attr:`uio.irq_missed`) and the interrupt is enabled again
+    before any callback is called.
+
+    Parameters
+    ----------
+    devices : iterable of :class:`uio`, optional
+        Devices to register.
+    callback : callable, optional
+        Default callback for devices registered from the constructor,
+        it is called as ``callback(dev, cnt)``.
+    """
+
+    def __init__(self, devices: tuple = (), callback = None):
+        self.epoll = select.epoll()
+        self.devices = {}
+        for dev in devices:
+            self.register(dev, callback)
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        """Close the `epoll` object, registered devices remain open."""
+        self.epoll.close()
+        self.devices = {}
+
+    def register(self, dev: uio, callback = None):
+        """Add device to the interrupt set and enable its interrupt.
+
+        Parameters
+        ----------
+        dev : :class:`uio`
+            UIO device driver instance.
+        callback : callable, optional
+            Function called as ``callback(dev, cnt)`` on each interrupt.
+        """
+        fd = dev.uio_dev.fileno()
+        self.epoll.register(fd, select.EPOLLIN)
+        self.devices[fd] = (dev, callback)
+        dev.irq_enable()
+
+    def unregister(self, dev: uio):
+        """Remove device from the interrupt set."""
+        fd = dev.uio_dev.fileno()
+        self.epoll.unregister(fd)
+        del(self.devices[fd])
+
+    def wait(self, timeout: float = None) -> list:
+        """Wait for interrupts on any of the registered devices.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Timeout in seconds, by default wait forever.
+
+        Returns
+        -------
+        list
+            Devices which received an interrupt,
+            empty if the timeout expired.
+        """
+        events = self.epoll.poll(-1 if timeout is None else timeout)
+        ready = []
+        for fd, mask in events:
+            dev, callback = self.devices[fd]
+            cnt = dev.irq_wait()
+            dev.irq_enable()
+            ready.append(dev)
+            if callback is not None:
+                callback(dev, cnt)
+        return ready
+
+    def run(self, stop = None, timeout: float = 0.1):
+        """Dispatch interrupts to callbacks until stopped.
+
+        Parameters
+        ----------
+        stop : :class:`threading.Event`, optional
+            Dispatching ends when the event is set,
+            by default it runs forever.
+        timeout : float, optional
+            Period for checking the `stop` event.
+        """
+        while stop is None or not stop.is_set():
+            self.wait(timeout)
+
+    @property
+    def counters(self) -> dict:
+        """Interrupt statistics ``{path: (handled, missed)}`` for each registered device."""
+        return {dev.uio_path: (dev.irq_handled, dev.irq_missed) for dev, callback in self.devices.values()}
@@ -0,0 +1 @@
+__all__ = ['accumulator', 'spectrum', 'equalizer', 'measure', 'trigger', 'display']
@@ -0,0 +1,136 @@
+import numpy as np
+
+from redpitaya.drv.transaction import transaction
+
+
+class accumulator(object):
+    """Running statistics over repeated captures.
+
+    Binary `int16` captures are accumulated into integer sums
+    (sum, sum of squares) and a min/max envelope per sample,
+    without conversion to float for each capture.
+    All arrays are allocated once, so memory does not grow
+    with the number of captures. Statistics are computed
+    on request, scaled with a per channel `gain` and `offset`::
+
+        acc = accumulator(channels=2)
+        acc.acquire([osc0, osc1], 10000)
+        mean, std = acc.mean(), acc.std()
+
+    64-bit sums of 16-bit squares allow more than 2**33 captures.
+
+    Parameters
+    ----------
+    channels : int, optional
+        Number of channels.
+    size : int, optional
+        Number of samples in a capture.
+
+    Attributes
+    ----------
+    count : int
+        Number of accumulated captures.
+    sum : ndarray
+        `int64` array of shape ``(channels, size)``.
+    sumsq : ndarray
+        `int64` sum of squares.
+    min, max : ndarray
+        `int16` envelope.
+    gain, offset : ndarray
+        Per channel scaling of statistics into volts,
+        ``volts = gain * sample + offset``.
+    """
+
+    def __init__(self, channels: int = 2, size: int = 2**14):
+        self.channels = channels
+        self.size = size
+        self.sum   = np.empty((channels, size), dtype=np.int64)
+        self.sumsq = np.empty((channels, size), dtype=np.int64)
+        self.min   = np.empty((channels, size), dtype=np.int16)
+        self.max   = np.empty((channels, size), dtype=np.int16)
+        self.gain   = np.ones(channels)
+        self.offset = np.zeros(channels)
+        # scratch arrays for a capture and its square
+        self._capture = np.empty((channels, size), dtype=np.int16)
+        self._square  = np.empty((channels, size), dtype=np.int64)
+        self.reset()
+
+    def reset(self):
+        """Clear accumulated statistics."""
+        self.count = 0
+        self.sum.fill(0)
+        self.sumsq.fill(0)
+        self.min.fill(np.iinfo(np.int16).max)
+        self.max.fill(np.iinfo(np.int16).min)
+
+    def add(self, samples: np.ndarray):
+        """Accumulate a capture.
+
+        Parameters
+        ----------
+        samples : ndarray
+            `int16` array of shape ``(channels, size)``.
+        """
+        if samples.shape != self.sum.shape:
+            raise ValueError("Capture shape should be {}.".format(self.sum.shape))
+        np.add(self.sum, samples, out=self.sum)
+        np.multiply(samples, samples, out=self._square, dtype=np.int64)
+        np.add(self.sumsq, self._square, out=self.sumsq)
+        np.minimum(self.min, samples, out=self.min)
+        np.maximum(self.max, samples, out=self.max)
+        self.count += 1
+
+    def acquire(self, devices: list, n: int, trigger: bool = False, timeout: float = None):
+        """Accumulate `n` captures from oscilloscope `devices`, one per channel.
+
+        All devices are started together in a :class:`transaction`
+        and should be configured (trigger, decimation) beforehand.
+        Channel gain and offset are taken from the device
+        input range and calibration.
+
+        Parameters
+        ----------
+        devices : list of :class:`osc`
+            Oscilloscopes, one for each channel.
+        n : int
+            Number of captures.
+        trigger : bool, optional
+            Trigger each capture by software, instead of waiting
+            for the configured hardware trigger.
+        timeout : float, optional
+            Timeout for each capture in seconds, by default wait forever.
+        """
+        if len(devices) != self.channels:
+            raise ValueError("Number of devices should be {}.".format(self.channels))
+        for ch, dev in enumerate(devices):
+            gain, offset = dev.calibration
+            self.gain[ch] = gain * dev.input_range / dev._DWr
+            self.offset[ch] = offset
+        for i in range(n):
+            with transaction(*devices):
+                for dev in devices:
+                    dev.reset()
+                    if trigger:
+                        dev.start_trigger()
+                    else:
+                        dev.start()
+            for ch, dev in enumerate(devices):
+                if not dev.wait_done(timeout):
+                    raise TimeoutError("Capture {} of {} was not acquired within {} s.".format(i, n, timeout))
+                dev.raw(self.size, (dev.pointer - self.size) % dev.buffer_size, out=self._capture[ch])
+            self.add(self._capture)
+
+    def mean(self) -> np.ndarray:
+        """Mean of accumulated captures in volts."""
+        return self.sum / self.count * self.gain[:, None] + self.offset[:, None]
+
+    def std(self) -> np.ndarray:
+        """Standard deviation of accumulated captures in volts."""
+        mean = self.sum / self.count
+        var = self.sumsq / self.count - mean * mean
+        return np.sqrt(np.maximum(var, 0)) * np.abs(self.gain[:, None])
+
+    def envelope(self) -> tuple:
+        """Minimum and maximum of accumulated captures in volts."""
+        return (self.min * self.gain[:, None] + self.offset[:, None],
+                self.max * self.gain[:, None] + self.offset[:, None])
@@ -0,0 +1,119 @@
+import numpy as np
+
+
+class display(object):
+    """Display decimation of captures into pixel columns.
+
+    A capture of `size` samples is reduced to `columns` columns,
+    so the cost of plotting does not depend on the capture size::
+
+        view = display(osc0.buffer_size, 1000)
+        x, y = view.reduce(osc0.data())
+        plot(x / osc0.sample_rate, y)
+
+    Methods:
+
+    * `minmax`: minimum and maximum of each column (peak detect),
+      two points at the column center, so short glitches are never lost,
+      the cost is a single vectorized pass over the samples,
+    * `lttb`: largest triangle three buckets, one sample per column
+      chosen to preserve the visual shape, without guarantees
+      for glitches, columns are processed in a loop,
+      vectorized over rows and samples within a column.
+
+    Parameters
+    ----------
+    size : int
+        Number of samples in a capture.
+    columns : int
+        Number of pixel columns, at most `size`.
+    method : str, optional
+        One of :attr:`methods`.
+
+    Attributes
+    ----------
+    x : ndarray
+        Sample positions of `minmax` points (fractional sample indices),
+        `None` for `lttb`, where they depend on data.
+    """
+    #: decimation methods
+    methods = ('minmax', 'lttb')
+
+    def __init__(self, size: int, columns: int, method: str = 'minmax'):
+        if method not in self.methods:
+            raise ValueError("Display decimation method should be one of {}.".format(self.methods))
+        if not (2 < columns <= size):
+            raise ValueError("Number of columns should be in range [3,{}].".format(size))
+        self.size = size
+        self.columns = columns
+        self.method = method
+        # first sample of each column
+        self._bounds = np.linspace(0, size, columns + 1).astype(np.intp)
+        if method == 'minmax':
+            centers = (self._bounds[:-1] + self._bounds[1:] - 1) / 2
+            self.x = np.repeat(centers, 2)
+        else:
+            self.x = None
+            # the first and last sample are kept, other samples are split into buckets
+            self._buckets = np.linspace(1, size - 1, columns - 1).astype(np.intp)
+
+    @property
+    def points(self) -> int:
+        """Number of points in a reduced capture."""
+        return 2 * self.columns if self.method == 'minmax' else self.columns
+
+    def reduce(self, data: np.ndarray, out: np.ndarray = None) -> tuple:
+        """Reduce captures to display points.
+
+        Parameters
+        ----------
+        data : ndarray
+            Captures of shape ``(..., size)``.
+        out : ndarray, optional
+            Array of shape ``(..., points)`` for reduced values.
+
+        Returns
+        -------
+        tuple
+            Sample positions `x` (fractional sample indices,
+            shape ``(points,)`` for `minmax`, per capture for `lttb`)
+            and values `y` of shape ``(..., points)``.
+        """
+        data = np.asarray(data)
+        if data.shape[-1] != self.size:
+            raise ValueError("Capture size should be {}.".format(self.size))
+        if out is None:
+            out = np.empty(data.shape[:-1] + (self.points,), dtype=data.dtype)
+        if self.method == 'minmax':
+            np.minimum.reduceat(data, self._bounds[:-1], axis=-1, out=out[..., 0::2])
+            np.maximum.reduceat(data, self._bounds[:-1], axis=-1, out=out[..., 1::2])
+            return self.x, out
+        return self._lttb(data, out)
+
+    def _lttb(self, data: np.ndarray, out: np.ndarray) -> tuple:
+        rows = data.reshape(-1, self.size)
+        y = out.reshape(-1, self.columns)
+        x = np.empty(y.shape, dtype=np.intp)
+        buckets = self._buckets
+        index = np.arange(len(rows))
+        # bucket averages, the next bucket average is the third triangle point
+        counts = np.diff(buckets)
+        avg_y = np.add.reduceat(rows[:, :buckets[-1]], buckets[:-1], axis=-1, dtype=np.float64) / counts
+        avg_x = (buckets[:-1] + buckets[1:] - 1) / 2
+        avg_y = np.concatenate((avg_y, rows[:, -1:]), axis=1)
+        avg_x = np.append(avg_x, self.size - 1)
+        x[:, 0] = 0
+        ay = rows[:, 0].astype(np.float64)
+        ax = np.zeros(len(rows))
+        for b in range(self.columns - 2):
+            lo, hi = buckets[b], buckets[b+1]
+            cx, cy = avg_x[b+1], avg_y[:, b+1]
+            # doubled triangle area for all samples in the bucket
+            area = np.abs((ax - cx)[:, None] * (rows[:, lo:hi] - ay[:, None])
+                          - (ax[:, None] - np.arange(lo, hi)) * (cy - ay)[:, None])
+            k = lo + np.argmax(area, axis=1)
+            x[:, b+1] = k
+            ax, ay = k.astype(np.float64), rows[index, k].astype(np.float64)
+        x[:, -1] = self.size - 1
+        y[:] = np.take_along_axis(rows, x, axis=1)
+        return x.reshape(out.shape), out
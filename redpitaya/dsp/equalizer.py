@@ -0,0 +1,253 @@
+import numpy as np
+import scipy.signal
+
+from redpitaya.drv.osc_fil import osc_fil
+
+
+def _wrap(value, bits: int):
+    """Two's complement truncation to `bits` (works on int and int64 arrays)."""
+    half = 1 << (bits - 1)
+    return ((value + half) & ((1 << bits) - 1)) - half
+
+
+class equalizer(object):
+    """Fixed point model of the oscilloscope input filter and decimator.
+
+    The model follows the FPGA equalization filter register by register
+    (a FIR zero followed by two IIR poles and a gain, see
+    `experiments/scope_filter.ipynb` for the transfer function),
+    including truncation of products, wrapping of register widths,
+    output saturation, and the decimator with optional averaging
+    and `cfg_shr` right shift. It can be used to predict hardware
+    output for captured raw data or test vectors, and to check
+    coefficient sets read from the EEPROM::
+
+        model = equalizer.from_device(osc0)
+        y = model.process(x)
+
+    The FIR stage, gain and decimator are vectorized. The recursive IIR
+    stages are solved in blocks of samples: a floating point estimate
+    (:func:`scipy.signal.lfilter`) is refined by fixed point iterations
+    of the exact integer recursion, vectorized over samples, until it
+    does not change, which gives the exact result in a few iterations.
+    Blocks, which do not settle, and large batches (many rows)
+    are evaluated sample by sample, for all rows of a batch at once.
+    Filter state is kept between calls to :meth:`process`,
+    so a long signal can be processed in blocks.
+
+    Parameters
+    ----------
+    coefficients : tuple, optional
+        Filter coefficients ``(aa, bb, kk, pp)``,
+        in the order of :attr:`osc_fil.filter_coeficients`.
+    decimation : int, optional
+        Decimation factor.
+    shift : int, optional
+        Right shift applied to the decimator sum (`cfg_shr`).
+    average : bool, optional
+        Average (sum) samples in the decimation window,
+        otherwise the last sample is taken.
+    bypass : bool, optional
+        Bypass the filter.
+    """
+    #: sample width
+    DW = 16
+
+    def __init__(self, coefficients: tuple = osc_fil._filters[1.0], decimation: int = 1,
+                 shift: int = 0, average: bool = False, bypass: bool = False):
+        self.aa, self.bb, self.kk, self.pp = (int(c) for c in coefficients)
+        self.decimation = decimation
+        self.shift = shift
+        self.average = average
+        self.bypass = bypass
+        # register widths for the sample width (14-bit reference design)
+        d = self.DW - 14
+        self._W01 = 32 + d
+        self._W02 = 28 + d
+        self._W2  = 23 + d
+        self._W3  = 23 + d
+        self._W4  = 15 + d
+        self.reset()
+
+    @classmethod
+    def from_device(cls, dev):
+        """Model configured like the filter registers of oscilloscope `dev`."""
+        fil = dev.regset.fil
+        return cls(coefficients = dev.filter_coeficients,
+                   decimation   = fil.cfg_dec + 1,
+                   shift        = fil.cfg_shr,
+                   average      = bool(fil.cfg_avg),
+                   bypass       = bool(fil.cfg_byp))
+
+    @classmethod
+    def from_clb(cls, clb_struct, ch: int, input_range: float, **kwargs):
+        """Model with coefficients from a parsed EEPROM calibration (:meth:`clb.eeprom_parse`)."""
+        cal = clb_struct.adc[ch].lo if input_range == 1 else clb_struct.adc[ch].hi
+        return cls(coefficients = (cal.fil_aa, cal.fil_bb, cal.fil_kk, cal.fil_pp), **kwargs)
+
+    def reset(self):
+        """Clear filter registers and decimator state."""
+        self._state = None
+
+    def _init_state(self, batch: int):
+        zero = np.zeros(batch, dtype=np.int64)
+        self._state = {name: zero.copy() for name in
+                       ('r01', 'r02', 'r1', 'r2', 'r3', 'r3_shr', 'r4', 'r4_r', 'r4_rr')}
+        self._state['rest'] = np.zeros((batch, 0), dtype=np.int64)
+
+    def filter(self, x: np.ndarray) -> np.ndarray:
+        """Filter `x` without decimation.
+
+        Parameters
+        ----------
+        x : ndarray
+            Integer samples, shape ``(n,)`` or ``(batch, n)``.
+
+        Returns
+        -------
+        ndarray
+            Filter output with the same shape as `x`, `int64`.
+        """
+        x = np.asarray(x, dtype=np.int64)
+        single = x.ndim == 1
+        x = np.atleast_2d(x)
+        if self._state is None or len(self._state['r01']) != len(x):
+            self._init_state(len(x))
+        if self.bypass:
+            return x[0] if single else x
+        s = self._state
+        n = x.shape[1]
+
+        # FIR (zero), all registers are updated on the same clock edge,
+        # r01[k+1] = x[k] << 18, r02[k+1] = (x[k] * bb) >> 10,
+        # r1[k+1] = r02[k] - r01[k], r2[k+1] = (r01[k] + r1[k]) >> 10
+        r01 = np.concatenate((s['r01'][:, None], _wrap(x << 18, self._W01)), axis=1)
+        r02 = np.concatenate((s['r02'][:, None], _wrap((x * self.bb) >> 10, self._W02)), axis=1)
+        r1  = np.concatenate((s['r1' ][:, None], r02[:, :-1] - r01[:, :-1]), axis=1)
+        r2  = np.concatenate((s['r2' ][:, None], _wrap((r01[:, :-1] + r1[:, :-1]) >> 10, self._W2)), axis=1)
+        s['r01'], s['r02'], s['r1'], s['r2'] = r01[:, -1], r02[:, -1], r1[:, -1], r2[:, -1]
+
+        # IIR (two poles), evaluated sample by sample
+        r4_0 = s['r4'].copy()
+        r4 = self._iir(r2[:, :-1])
+
+        # gain (two register delay) and saturation
+        r4 = np.concatenate((s['r4_rr'][:, None], s['r4_r'][:, None], r4_0[:, None], r4), axis=1)
+        s['r4_rr'], s['r4_r'] = r4[:, n], r4[:, n+1]
+        limit = (1 << (self.DW - 1))
+        y = np.clip(_wrap((r4[:, :n] * self.kk) >> 24, self._W4), -limit, limit - 1)
+        return y[0] if single else y
+
+    # IIR evaluation, batches with at least `_LOOP_ROWS` rows are evaluated
+    # sample by sample, smaller ones in blocks of about `_BLOCK` samples
+    # (at most `_BLOCK_ROW` per row), refined for at most `_ITERATIONS`
+    _LOOP_ROWS = 256
+    _BLOCK = 2**14
+    _BLOCK_ROW = 2048
+    _ITERATIONS = 12
+
+    def _iir(self, r2: np.ndarray) -> np.ndarray:
+        rows, n = r2.shape
+        if rows >= self._LOOP_ROWS or not n:
+            return self._iir_loop(r2)
+        size = min(max(self._BLOCK // rows, 512), self._BLOCK_ROW)
+        return np.concatenate([self._iir_block(r2[:, i:i+size]) for i in range(0, n, size)], axis=1)
+
+    def _iir_block(self, r2: np.ndarray) -> np.ndarray:
+        """IIR stages for a block of samples, solved by fixed point iteration.
+
+        Given all register values, the recursion gives each next value
+        with vectorized operations, the first register value is known
+        from state, so iterations converge to the exact sequence.
+        """
+        s = self._state
+        aa, pp = self.aa, self.pp
+        rows, n = r2.shape
+        # first pole, r3[k+1] = r3[k] + r2[k] + ((-r3[k] * aa) >> 25),
+        # the sum of increments is wrapped like each step
+        A = 1 - aa / 2**25
+        r3 = np.empty((rows, n+1), dtype=np.int64)
+        r3[:, 0] = s['r3']
+        r3[:, 1:] = np.rint(scipy.signal.lfilter([1.0], [1.0, -A], r2 - 0.5, axis=1, zi=A * s['r3'][:, None])[0])
+        for _ in range(self._ITERATIONS):
+            r3_next = _wrap(s['r3'][:, None] + np.cumsum(r2 + ((-r3[:, :n] * aa) >> 25), axis=1), self._W3)
+            if np.array_equal(r3_next, r3[:, 1:]):
+                break
+            r3[:, 1:] = r3_next
+        else:
+            return self._iir_loop(r2)
+        r3_shr = np.concatenate((s['r3_shr'][:, None], r3[:, :n] >> 8), axis=1)
+        # second pole, r4[k+1] = r3_shr[k] + ((r4[k] * pp) >> 16)
+        P = pp / 2**16
+        r4 = np.empty((rows, n+1), dtype=np.int64)
+        r4[:, 0] = s['r4']
+        r4[:, 1:] = np.rint(scipy.signal.lfilter([1.0], [1.0, -P], r3_shr[:, :n] - 0.5, axis=1, zi=P * s['r4'][:, None])[0])
+        for _ in range(self._ITERATIONS):
+            r4_next = _wrap(r3_shr[:, :n] + ((r4[:, :n] * pp) >> 16), self._W4)
+            if np.array_equal(r4_next, r4[:, 1:]):
+                break
+            r4[:, 1:] = r4_next
+        else:
+            return self._iir_loop(r2)
+        s['r3'], s['r3_shr'], s['r4'] = r3[:, n].copy(), r3_shr[:, n].copy(), r4[:, n].copy()
+        return r4[:, 1:]
+
+    def _iir_loop(self, r2: np.ndarray) -> np.ndarray:
+        """IIR stages evaluated sample by sample."""
+        s = self._state
+        aa, pp = self.aa, self.pp
+        W3, W4 = self._W3, self._W4
+        if len(r2) == 1:
+            # Python integers are faster than NumPy scalars for a single row
+            r3, r3_shr, r4 = int(s['r3'][0]), int(s['r3_shr'][0]), int(s['r4'][0])
+            samples = r2[0].tolist()
+        else:
+            r3, r3_shr, r4 = s['r3'], s['r3_shr'], s['r4']
+            samples = r2.T
+        out = []
+        for v in samples:
+            r3, r3_shr, r4 = (_wrap(((v << 25) + (r3 << 25) - r3 * aa) >> 25, W3),
+                              r3 >> 8,
+                              _wrap(r3_shr + ((r4 * pp) >> 16), W4))
+            out.append(r4)
+        s['r3'][:], s['r3_shr'][:], s['r4'][:] = r3, r3_shr, r4
+        if len(r2) == 1:
+            return np.array(out, dtype=np.int64).reshape(1, -1)
+        return np.array(out, dtype=np.int64).reshape(-1, len(r2)).T
+
+    def decimate(self, y: np.ndarray) -> np.ndarray:
+        """Decimate filter output `y`, incomplete windows are kept for the next call."""
+        single = y.ndim == 1
+        y = np.atleast_2d(y)
+        if self._state is None or len(self._state['rest']) != len(y):
+            self._init_state(len(y))
+        s = self._state
+        y = np.concatenate((s['rest'], y), axis=1)
+        m = y.shape[1] // self.decimation
+        s['rest'] = y[:, m * self.decimation:]
+        windows = y[:, :m * self.decimation].reshape(len(y), m, self.decimation)
+        if self.average:
+            out = windows.sum(axis=2) >> self.shift
+        else:
+            out = windows[:, :, -1]
+        limit = (1 << (self.DW - 1))
+        out = np.clip(out, -limit, limit - 1).astype(np.int16)
+        return out[0] if single else out
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        """Filter and decimate `x`, return `int16` samples as stored into the buffer."""
+        return self.decimate(self.filter(x))
+
+    def response(self, worN: int = 512, fs: float = 125e6) -> tuple:
+        """Ideal (floating point) frequency response of the filter.
+
+        Returns
+        -------
+        tuple
+            Frequencies in Hz and complex response, see :func:`scipy.signal.freqz`.
+        """
+        K = self.kk / 2**24
+        B = 1 - self.bb / 2**28
+        P = self.pp / 2**16
+        A = 1 - self.aa / 2**25
+        return scipy.signal.freqz([K, -K*B], [1, -(P+A), P*A], worN=worN, fs=fs)
@@ -0,0 +1,183 @@
+import numpy as np
+
+
+class measure(object):
+    """Standard oscilloscope measurements over batches of captures.
+
+    All measurements are computed for all records at once with
+    vectorized NumPy operations, records are processed in chunks
+    of `chunk` records to limit the size of temporary arrays::
+
+        m = measure(data, osc0.sample_period)
+        print(m.frequency, m.rise)
+
+    Top and base levels are the most frequent values (the mean
+    of samples in the histogram mode) in the upper and lower half
+    of the signal range,
+    for signals without flat levels (sine, triangle) the maximum
+    and minimum are used instead. Edges are detected with hysteresis
+    between the 10% and 90% levels (between base and top),
+    crossing times are linearly interpolated between samples.
+
+    Measurements, which are not defined for a record (for example
+    the period of a record with less than two rising edges), are `NaN`.
+
+    Parameters
+    ----------
+    data : ndarray
+        Array of shape ``(..., samples)``, for example
+        ``(channels, records, samples)``.
+    sample_period : float, optional
+        Sample period in seconds, times are in samples if not given.
+    bins : int, optional
+        Number of histogram bins for top/base detection.
+    chunk : int, optional
+        Number of records processed at once, temporary arrays
+        of a chunk should fit into the CPU cache.
+
+    Attributes
+    ----------
+    max, min, vpp, mean, rms : ndarray
+        Extremes, peak to peak, mean and RMS value.
+    top, base, amplitude : ndarray
+        Histogram based high and low level and their difference.
+    frequency, period : ndarray
+        Average over rising edges (in Hz and seconds).
+    duty : ndarray
+        Ratio of time above the 50% level, over full periods.
+    rise, fall : ndarray
+        Average 10% to 90% rise and fall time in seconds.
+    edges : ndarray
+        Number of rising edges.
+
+    All attributes have the shape of `data` without the last axis.
+    """
+    #: measurement attributes
+    names = ('max', 'min', 'vpp', 'mean', 'rms', 'top', 'base', 'amplitude',
+             'frequency', 'period', 'duty', 'rise', 'fall', 'edges')
+
+    def __init__(self, data: np.ndarray, sample_period: float = 1.0, bins: int = 256, chunk: int = 16):
+        data = np.asarray(data)
+        shape = data.shape[:-1]
+        records = data.reshape(-1, data.shape[-1])
+        self.sample_period = sample_period
+        self.bins = bins
+        results = {name: np.empty(len(records), dtype=int if name == 'edges' else float)
+                   for name in self.names}
+        for start in range(0, len(records), chunk):
+            chunk_results = self._measure(records[start:start+chunk].astype(np.float32))
+            for name in self.names:
+                results[name][start:start+chunk] = chunk_results[name]
+        for name in self.names:
+            setattr(self, name, results[name].reshape(shape))
+
+    def _levels(self, x: np.ndarray, vmin: np.ndarray, vmax: np.ndarray) -> tuple:
+        """Histogram based base and top levels, the mean of samples in the most frequent bin."""
+        rows, n = x.shape
+        bins = self.bins
+        span = np.where(vmax > vmin, vmax - vmin, 1)
+        index = np.minimum(((x - vmin[:, None]) * (bins / span)[:, None]).astype(np.intp), bins - 1)
+        index += (np.arange(rows) * bins)[:, None]
+        index = index.ravel()
+        hist = np.bincount(index, minlength=rows * bins).reshape(rows, bins)
+        sums = np.bincount(index, x.ravel(), minlength=rows * bins).reshape(rows, bins)
+        half = bins // 2
+        lo = np.argmax(hist[:, :half], axis=1)
+        hi = np.argmax(hist[:, half:], axis=1) + half
+        row = np.arange(rows)
+        with np.errstate(invalid='ignore'):
+            base = sums[row, lo] / hist[row, lo]
+            top  = sums[row, hi] / hist[row, hi]
+        # without a distinct flat level use extremes
+        significant = n / bins * 4
+        base = np.where(hist[row, lo] > significant, base, vmin)
+        top  = np.where(hist[row, hi] > significant, top , vmax)
+        return base, top
+
+    @staticmethod
+    def _transitions(mask: np.ndarray) -> tuple:
+        """Flat indices `k` where `mask` changes between samples `k` and `k+1` within a record,
+        and whether it changes to true."""
+        # one dimensional search is much faster, changes between records are dropped
+        m = mask.ravel()
+        k = np.flatnonzero(m[1:] != m[:-1])
+        k = k[k % mask.shape[1] != mask.shape[1] - 1]
+        return k, m[k+1]
+
+    @staticmethod
+    def _cross(f: np.ndarray, k: np.ndarray, level: np.ndarray) -> np.ndarray:
+        """Interpolated (flat) time of crossing `level` between samples `k` and `k+1` of `f`."""
+        f0 = f[k]
+        f1 = f[k+1]
+        return k + (level - f0) / np.where(f1 != f0, f1 - f0, 1)
+
+    @staticmethod
+    def _edges(entries: np.ndarray, exits: np.ndarray, others: np.ndarray, n: int) -> tuple:
+        """Entries into a level zone after leaving the other zone (edges with hysteresis).
+
+        Returns edge samples and the last sample in the other zone before them.
+        """
+        events = np.concatenate((exits, others))
+        order = np.argsort(events, kind='stable')
+        events = events[order]
+        own = order < len(exits)
+        p = np.searchsorted(events, entries) - 1
+        valid = p >= 0
+        p = np.maximum(p, 0)
+        valid &= ~own[p] & (events[p] // n == entries // n)
+        return entries[valid], events[p[valid]]
+
+    def _measure(self, x: np.ndarray) -> dict:
+        rows, n = x.shape
+        r = {}
+        r['max']  = x.max(axis=1)
+        r['min']  = x.min(axis=1)
+        r['vpp']  = r['max'] - r['min']
+        r['mean'] = x.mean(axis=1, dtype=np.float64)
+        r['rms']  = np.sqrt(np.einsum('ij,ij->i', x, x, dtype=np.float64) / n)
+        base, top = self._levels(x, r['min'], r['max'])
+        r['base'], r['top'], r['amplitude'] = base, top, top - base
+        lo  = base + 0.1 * (top - base)
+        mid = base + 0.5 * (top - base)
+        hi  = base + 0.9 * (top - base)
+
+        # level zones and their transitions
+        f = x.ravel()
+        k_hi, up_hi = self._transitions(x >= hi[:, None])
+        k_lo, up_lo = self._transitions(x <= lo[:, None])
+        k_mid, up_mid = self._transitions(x > mid[:, None])
+
+        # rising edges enter the high zone after the low zone,
+        # falling edges enter the low zone after the high zone
+        i, j = self._edges(k_hi[up_hi] + 1, k_hi[~up_hi], k_lo[~up_lo], n)
+        row = i // n
+        rise = self._cross(f, i - 1, hi[row]) - self._cross(f, j, lo[row])
+        # the last 50% crossing before the edge
+        k_up = k_mid[up_mid]
+        t_mid = self._cross(f, k_up[np.searchsorted(k_up, i) - 1], mid[row])
+        i, j = self._edges(k_lo[up_lo] + 1, k_lo[~up_lo], k_hi[~up_hi], n)
+        frow = i // n
+        fall = self._cross(f, i - 1, lo[frow]) - self._cross(f, j, hi[frow])
+
+        count = np.bincount(row, minlength=rows)
+        fcount = np.bincount(frow, minlength=rows)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r['rise'] = np.bincount(row, rise, minlength=rows) / count * self.sample_period
+            r['fall'] = np.bincount(frow, fall, minlength=rows) / fcount * self.sample_period
+            # period from the first and last rising edge, edges are sorted
+            index = np.arange(rows)
+            t_mid = np.append(t_mid, np.nan)
+            first = t_mid[np.where(count > 0, np.searchsorted(row, index, 'left'), -1)]
+            last  = t_mid[np.where(count > 0, np.searchsorted(row, index, 'right') - 1, -1)]
+            period = (last - first) / (count - 1)
+            r['period'] = np.where(count > 1, period * self.sample_period, np.nan)
+            r['frequency'] = 1 / r['period']
+            # duty cycle over full periods, 50% crossings alternate,
+            # so time above is the sum of falling minus rising crossing times
+            mrow = k_mid // n
+            t = self._cross(f, k_mid, mid[mrow])
+            inside = (t >= first[mrow]) & (t < last[mrow])
+            high = np.bincount(mrow[inside], np.where(up_mid, -t, t)[inside], minlength=rows)
+            r['duty'] = np.where(count > 1, high / (last - first), np.nan)
+        r['edges'] = count
+        return r
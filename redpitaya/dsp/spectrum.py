@@ -0,0 +1,177 @@
+import inspect
+import numpy as np
+import scipy.signal
+
+
+# `out` argument is available since NumPy 2.0
+_RFFT_OUT = 'out' in inspect.signature(np.fft.rfft).parameters
+
+
+class spectrum(object):
+    """Spectrum analyser.
+
+    Captures are multiplied by a window, transformed with a real FFT
+    and converted into an amplitude spectral density in dBV/sqrt(Hz).
+    Windows are cached for each type and size, all intermediate
+    and result arrays are allocated once, so processing a frame
+    does not allocate memory (the FFT output array is reused
+    with NumPy 2.0 or newer)::
+
+        s = spectrum(2**14, averaging='exponential')
+        while True:
+            s.acquire(osc0)
+            plot(s.frequencies, s.density())
+
+    Averaging modes:
+
+    * `none`: last frame only,
+    * `linear`: mean of all frames since :meth:`reset`,
+    * `exponential`: exponential moving average with weight `alpha`,
+    * `peak`: maximum of all frames since :meth:`reset` (peak hold).
+
+    Parameters
+    ----------
+    size : int
+        Number of samples in a frame.
+    sample_rate : float, optional
+        Sample rate in Hz, :meth:`acquire` takes it from the device.
+    window : str, optional
+        Window type, see :func:`scipy.signal.get_window`.
+    averaging : str, optional
+        One of :attr:`averagings`.
+    alpha : float, optional
+        Exponential averaging weight of a new frame.
+
+    Attributes
+    ----------
+    count : int
+        Number of averaged frames.
+    power : ndarray
+        Averaged single sided power spectral density in V**2/Hz.
+    """
+    #: averaging modes
+    averagings = ('none', 'linear', 'exponential', 'peak')
+
+    # windows cached by (type, size)
+    _windows = {}
+
+    def __init__(self, size: int, sample_rate: float = 1.0, window: str = 'hann',
+                 averaging: str = 'none', alpha: float = 0.1):
+        if averaging not in self.averagings:
+            raise ValueError("Averaging should be one of {}.".format(self.averagings))
+        self.size = size
+        self.sample_rate = sample_rate
+        self.averaging = averaging
+        self.alpha = alpha
+        self.window = self.get_window(window, size)
+        # density scaling factor for the window
+        self._wss = np.sum(self.window**2)
+        self._frame    = np.empty(size)
+        self._fft      = np.empty(size//2+1, dtype=np.complex128)
+        self._frame_ps = np.empty(size//2+1)
+        self._db       = np.empty(size//2+1)
+        self.power     = np.zeros(size//2+1)
+        self.reset()
+
+    @classmethod
+    def get_window(cls, window: str, size: int) -> np.ndarray:
+        """Return a cached periodic window."""
+        key = (window, size)
+        if key not in cls._windows:
+            cls._windows[key] = scipy.signal.get_window(window, size)
+        return cls._windows[key]
+
+    def reset(self):
+        """Restart averaging."""
+        self.count = 0
+        self.power.fill(0)
+
+    @property
+    def frequencies(self) -> np.ndarray:
+        """Frequencies of spectrum bins in Hz."""
+        return np.fft.rfftfreq(self.size, 1 / self.sample_rate)
+
+    @property
+    def resolution(self) -> float:
+        """Frequency resolution (bin width) in Hz."""
+        return self.sample_rate / self.size
+
+    def update(self, frame: np.ndarray) -> np.ndarray:
+        """Process a frame of `size` samples in volts.
+
+        Returns
+        -------
+        ndarray
+            Averaged power spectral density (:attr:`power`).
+        """
+        np.multiply(frame, self.window, out=self._frame)
+        return self._process()
+
+    def acquire(self, dev, ptr: int = None) -> np.ndarray:
+        """Process the last `size` samples captured by oscilloscope `dev`.
+
+        Parameters
+        ----------
+        dev : :class:`osc`
+            Oscilloscope, the sample rate is taken from it.
+        ptr : int, optional
+            Buffer pointer after the last sample,
+            by default the current write pointer.
+
+        Returns
+        -------
+        ndarray
+            Averaged power spectral density (:attr:`power`).
+        """
+        if ptr is None:
+            ptr = dev.pointer
+        self.sample_rate = dev.sample_rate
+        dev.data(self.size, (ptr - self.size) % dev.buffer_size, out=self._frame)
+        np.multiply(self._frame, self.window, out=self._frame)
+        return self._process()
+
+    def _process(self) -> np.ndarray:
+        if _RFFT_OUT:
+            np.fft.rfft(self._frame, out=self._fft)
+        else:
+            self._fft[:] = np.fft.rfft(self._frame)
+        ps = self._frame_ps
+        np.abs(self._fft, out=ps)
+        np.square(ps, out=ps)
+        # single sided density, DC and Nyquist bins are not doubled
+        ps *= 2 / (self.sample_rate * self._wss)
+        ps[0] /= 2
+        if self.size % 2 == 0:
+            ps[-1] /= 2
+        # averaging
+        self.count += 1
+        if self.averaging == 'none' or self.count == 1:
+            self.power[:] = ps
+        elif self.averaging == 'linear':
+            self.power *= (self.count - 1) / self.count
+            ps *= 1 / self.count
+            self.power += ps
+        elif self.averaging == 'exponential':
+            self.power *= 1 - self.alpha
+            ps *= self.alpha
+            self.power += ps
+        elif self.averaging == 'peak':
+            np.maximum(self.power, ps, out=self.power)
+        return self.power
+
+    def density(self, out: np.ndarray = None) -> np.ndarray:
+        """Averaged amplitude spectral density in dBV/sqrt(Hz).
+
+        Parameters
+        ----------
+        out : ndarray, optional
+            Array to write the result into, by default an internal
+            array is reused, so it is overwritten by the next call.
+        """
+        if out is None:
+            out = self._db
+        # 10*log10 of power is 20*log10 of amplitude
+        np.maximum(self.power, np.finfo(out.dtype).tiny, out=out)
+        np.log10(out, out=out)
+        out *= 10
+        return out
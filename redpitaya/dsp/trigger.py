@@ -0,0 +1,187 @@
+import numpy as np
+
+
+class trigger(object):
+    """Software trigger over streamed sample blocks.
+
+    Blocks are scanned with vectorized operations, only level crossings
+    (sparse compared to samples) are processed individually.
+    Hysteresis state is kept between calls to :meth:`scan`,
+    so events spanning block boundaries are detected::
+
+        trg = trigger.from_device(osc0, mode='pulse', width=(100, 200))
+        for index, block, events in trg.stream(osc0.stream(raw=True)):
+            ...
+
+    Levels ``[neg, pos]`` and edge follow :class:`osc_trg`:
+    for the positive edge, the signal is low below the negative level
+    and high at or above the positive level, for the negative edge
+    it is high above the positive level and low at or below the negative level.
+    The trigger is armed when the signal is low and fires when it becomes high.
+
+    Modes:
+
+    * `edge`: on the edge, same as the hardware trigger,
+    * `pulse`: at the end of a pulse (from edge to the opposite edge)
+      with a width within `width`,
+    * `runt`: at the end of a pulse, which leaves the low state,
+      but returns without reaching the high state,
+    * `window`: when the signal leaves the window between levels
+      (positive edge) or enters it (negative edge),
+    * `slew`: on an edge, with the transition time between levels
+      (last low to first high sample) within `width`.
+
+    Parameters
+    ----------
+    level : tuple
+        Levels ``[neg, pos]`` in units of scanned samples
+        (binary values for `raw` streams).
+    edge : str, optional
+        Edge `pos` or `neg`.
+    mode : str, optional
+        One of :attr:`modes`.
+    width : tuple, optional
+        Minimum and maximum pulse width or transition time in samples.
+
+    Attributes
+    ----------
+    index : int
+        Index of the next expected sample.
+    """
+    #: trigger modes
+    modes = ('edge', 'pulse', 'runt', 'window', 'slew')
+    # trigger edge dictionary
+    _edges = {'pos': 0, 'neg': 1}
+
+    def __init__(self, level: tuple, edge: str = 'pos', mode: str = 'edge', width: tuple = (0, np.inf)):
+        if mode not in self.modes:
+            raise ValueError("Trigger mode should be one of {}.".format(self.modes))
+        if edge not in self._edges:
+            raise ValueError("Trigger edge should be one of {}".format(list(self._edges.keys())))
+        if level[0] > level[1]:
+            raise ValueError("Trigger negative level should not be above the positive level.")
+        self.level = tuple(level)
+        self.edge = edge
+        self.mode = mode
+        self.width = tuple(width)
+        self.reset()
+
+    @classmethod
+    def from_device(cls, dev, **kwargs):
+        """Trigger with binary levels and edge of oscilloscope `dev`, for `raw` streams."""
+        trg = dev.regset.trg
+        return cls(level=(trg.cfg_neg, trg.cfg_pos), edge=dev.edge, **kwargs)
+
+    def reset(self, index: int = 0):
+        """Clear hysteresis state, the next sample has `index`."""
+        self.index = index
+        # last entered state (-1 low, 1 high, 0 unknown), previous sample,
+        # index of the last edge and of the last low sample
+        self._state = 0
+        self._prev = None
+        self._edge = None
+        self._low = None
+
+    @staticmethod
+    def _entries(mask: np.ndarray, prev: bool) -> np.ndarray:
+        """Indices of samples where `mask` becomes true."""
+        k = np.flatnonzero(mask[1:] > mask[:-1]) + 1
+        if mask[0] and prev is not None and not prev:
+            k = np.concatenate(([0], k))
+        return k
+
+    def scan(self, block: np.ndarray, index: int = None) -> np.ndarray:
+        """Scan a block of samples.
+
+        Parameters
+        ----------
+        block : ndarray
+            Samples following the previous block.
+        index : int, optional
+            Index of the first sample, if it differs from
+            :attr:`index` (samples were lost), the state is reset.
+
+        Returns
+        -------
+        ndarray
+            `int64` indices of samples where the trigger fired.
+        """
+        if index is not None and index != self.index:
+            self.reset(index)
+        if not len(block):
+            return np.empty(0, dtype=np.int64)
+        neg, pos = self.level
+        prev = self._prev
+
+        if self.mode == 'window':
+            inside = (block >= neg) & (block <= pos)
+            prev_inside = None if prev is None else bool(neg <= prev <= pos)
+            if self.edge == 'pos':
+                fired = self._entries(~inside, None if prev is None else not prev_inside)
+            else:
+                fired = self._entries(inside, prev_inside)
+        else:
+            if self.edge == 'pos':
+                low, high = block < neg, block >= pos
+                prev_low, prev_high = (None, None) if prev is None else (prev < neg, prev >= pos)
+            else:
+                low, high = block > pos, block <= neg
+                prev_low, prev_high = (None, None) if prev is None else (prev > pos, prev <= neg)
+            # entries into low and high states in order of samples,
+            # an edge is an entry into the other state than the last one
+            k_high = self._entries(high, prev_high)
+            k_low = self._entries(low, prev_low)
+            k = np.concatenate((k_high, k_low))
+            state = np.concatenate((np.ones(len(k_high), dtype=np.int8), -np.ones(len(k_low), dtype=np.int8)))
+            order = np.argsort(k, kind='stable')
+            k, state = k[order], state[order]
+            last = np.concatenate(([self._state], state[:-1])).astype(np.int8)
+            edges = state != last
+            if self.mode == 'edge':
+                fired = k[edges & (state == 1) & (last == -1)]
+            elif self.mode == 'pulse':
+                # pulse from an edge (entry into high) to the opposite edge
+                k_edge = k[edges & (last != 0)] + self.index
+                starts = np.concatenate(([np.nan if self._edge is None else self._edge], k_edge[:-1]))
+                ends = (state[edges & (last != 0)] == -1)
+                widths = k_edge - starts
+                ok = ends & (widths >= self.width[0]) & (widths <= self.width[1])
+                fired = k_edge[ok] - self.index
+                if len(k_edge):
+                    self._edge = k_edge[-1]
+            elif self.mode == 'runt':
+                fired = k[(state == -1) & (last == -1)]
+            elif self.mode == 'slew':
+                # last low sample before each edge
+                k_rise = k[edges & (state == 1) & (last == -1)]
+                k_exit = np.flatnonzero(low[:-1] > low[1:])
+                exits = np.concatenate(([np.nan if self._low is None else self._low - self.index], k_exit))
+                times = k_rise - exits[np.searchsorted(k_exit, k_rise)]
+                fired = k_rise[(times >= self.width[0]) & (times <= self.width[1])]
+                if low[-1]:
+                    self._low = self.index + len(block) - 1
+                elif len(k_exit):
+                    self._low = self.index + k_exit[-1]
+            if len(state):
+                self._state = state[-1]
+
+        self._prev = block[-1].item()
+        fired = fired.astype(np.int64) + self.index
+        self.index += len(block)
+        return fired
+
+    def stream(self, blocks):
+        """Scan blocks of a stream.
+
+        Parameters
+        ----------
+        blocks : iterable
+            ``(index, block)`` tuples, for example from :meth:`osc.stream`.
+
+        Yields
+        ------
+        tuple
+            ``(index, block, fired)``, see :meth:`scan`.
+        """
+        for index, block in blocks:
+            yield index, block, self.scan(block, index)
@@ -11,9 +11,12 @@ from redpitaya.drv.gen     import gen
 from redpitaya.drv.osc     import osc
 from redpitaya.drv.lg      import lg
 from redpitaya.drv.la      import la
+from redpitaya.drv.transaction import transaction
 
 import iio
 
+import numpy as np
+
 
 class mercury(overlay):
 
@@ -101,17 +104,83 @@ class mercury(overlay):
             else:
                 raise ValueError("Output amplitude should be inside [0,{}] volts.".format(self.V))
 
+    # combined register commit across modules, `mercury.transaction(osc0, gen0)`
+    transaction = transaction
+
+    @staticmethod
+    def acquire_pair(osc0: osc, osc1: osc, siz: int = osc.buffer_size, out: np.ndarray = None,
+                     dtype = np.float64, trigger: bool = False, timeout: float = None) -> np.ndarray:
+        """Simultaneous capture on both oscilloscope channels.
+
+        `osc1` is synchronized to the software events of `osc0`
+        (`sync_src`), so a single start (and optional software trigger)
+        arms both channels on the same clock. After `osc0` is done,
+        a single pointer is read and the same buffer segment is copied
+        from both channels, so they line up sample for sample.
+        Trigger source and pre/post trigger delays should be configured
+        the same on both channels, the synchronization source of `osc1`
+        is restored after the capture.
+
+        Parameters
+        ----------
+        osc0, osc1 : :class:`osc`
+            Leading and following channel.
+        siz : int, optional
+            Number of samples, ending at the last acquired sample.
+        out : array, optional
+            Preallocated array of shape ``(2, siz)``, an integer array
+            gets binary samples (:meth:`osc.raw`), a float array volts
+            (:meth:`osc.data`).
+        dtype : data-type, optional
+            Data type of the returned array if `out` is not given.
+        trigger : bool, optional
+            Trigger by software, instead of waiting for the configured trigger.
+        timeout : float, optional
+            Timeout in seconds, by default wait forever.
+
+        Returns
+        -------
+        array
+            Array of shape ``(2, siz)``.
+        """
+        if out is None:
+            out = np.empty((2, siz), dtype=dtype)
+        elif out.shape != (2, siz):
+            raise ValueError("Output array shape should be {}.".format((2, siz)))
+        for name in ('trig_src', 'trigger_pre', 'trigger_post'):
+            if getattr(osc0, name) != getattr(osc1, name):
+                raise ValueError("Oscilloscope channels should have the same {}.".format(name))
+        # `osc1` follows `osc0` only during the capture
+        sync_src = osc1.sync_src
+        osc1.sync_src = osc0.sync_src
+        try:
+            osc0.reset()
+            if trigger:
+                osc0.start_trigger()
+            else:
+                osc0.start()
+            # on hardware both channels stop on the same clock,
+            # the second wait returns immediately
+            if not (osc0.wait_done(timeout) and osc1.wait_done(timeout)):
+                raise TimeoutError("Capture was not acquired within {} s.".format(timeout))
+        finally:
+            osc1.sync_src = sync_src
+        ptr = (osc0.pointer - siz) % osc0.buffer_size
+        read = osc.raw if np.issubdtype(out.dtype, np.integer) else osc.data
+        read(osc0, siz, ptr, out=out[0])
+        read(osc1, siz, ptr, out=out[1])
+        return out
+
     class clb(clb):
         # TODO, add checks
         pass
 
     class gen(gen):
         def __init__(self, index: int):
-            self.calib = clb()
-            self.eeprom_user = self.calib.eeprom_read()
-            self.calib_user = self.calib.eeprom_parse(self.eeprom_user)
-            self.calib.calib_dac_apply(self.calib_user)
-            del(self.calib)
+            with clb() as calib:
+                self.eeprom_user = calib.eeprom_read()
+                self.calib_user = calib.eeprom_parse(self.eeprom_user)
+                calib.calib_dac_apply(self.calib_user)
             if index in range(mercury._MNG):
                 super().__init__(index=index)
                 self.sync_src = mercury.sync_src['gen'+str(index)]
@@ -120,25 +189,37 @@ class mercury(overlay):
 
     class osc(osc):
         def __init__(self, index: int, input_range: float):
-            self.calib = clb()
-            self.eeprom_user = self.calib.eeprom_read()
-            self.calib_user = self.calib.eeprom_parse(self.eeprom_user)
-            self.calib.calib_adc_apply(self.calib_user,index,input_range)
-            #self.calib.calib_show(self.calib_user)
-            del(self.calib)
-            if index in range(mercury._MNO):
-                super().__init__(index=index, input_range=input_range)
-                self.sync_src = mercury.sync_src['osc'+str(index)]
-                self.trig_src = mercury.trig_src['osc'+str(index)]
-                if (input_range == 1.0):
-                    fil_cof = self.calib_user.adc[index].lo
-                    self.filter_coeficients = (fil_cof.fil_aa,fil_cof.fil_bb,fil_cof.fil_kk,fil_cof.fil_pp)
-                else:
-                    fil_cof = self.calib_user.adc[index].hi
-                    self.filter_coeficients = (fil_cof.fil_aa,fil_cof.fil_bb,fil_cof.fil_kk,fil_cof.fil_pp)
-            #    self.show_regset()
-            else:
+            if index not in range(mercury._MNO):
                 raise ValueError("Oscilloscope index should be one of {}".format(range(mercury._MNO)))
+            self.index = index
+            with clb() as calib:
+                self.eeprom_user = calib.eeprom_read()
+                self.calib_user = calib.eeprom_parse(self.eeprom_user)
+                # residual calibration depends on FPGA calibration registers,
+                # which are different for each range
+                self.calibrations = {}
+                for rng in self.ranges:
+                    calib.calib_adc_apply(self.calib_user, index, rng)
+                    gain, offset = calib.calib_adc_residual(self.calib_user, index, rng)
+                    self.calibrations[rng] = (gain, offset * rng / self._DWr)
+                #calib.calib_show(self.calib_user)
+            super().__init__(index=index, input_range=input_range)
+            self.sync_src = mercury.sync_src['osc'+str(index)]
+            self.trig_src = mercury.trig_src['osc'+str(index)]
+        #    self.show_regset()
+
+        @osc.input_range.setter
+        def input_range(self, value: float):
+            osc.input_range.fset(self, value)
+            # FPGA and software calibration, filter coefficients for the selected range
+            with clb() as calib:
+                calib.calib_adc_apply(self.calib_user, self.index, value)
+            self.calibration = self.calibrations[value]
+            if (value == 1.0):
+                fil_cof = self.calib_user.adc[self.index].lo
+            else:
+                fil_cof = self.calib_user.adc[self.index].hi
+            self.filter_coeficients = (fil_cof.fil_aa,fil_cof.fil_bb,fil_cof.fil_kk,fil_cof.fil_pp)
 
     class lg(lg):
         def __init__(self):
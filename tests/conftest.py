@@ -0,0 +1,35 @@
+import pytest
+
+from redpitaya.drv.emu import emu
+
+
+@pytest.fixture
+def devices():
+    """Emulated Red Pitaya devices, removed after the test."""
+    devices = emu.mercury()
+    yield devices
+    emu.close_all()
+
+
+@pytest.fixture
+def driver(devices):
+    """Driver factory, drivers are closed before emulated devices are removed."""
+    drivers = []
+
+    def open_driver(cls, *args, **kwargs):
+        dev = cls(*args, **kwargs)
+        drivers.append(dev)
+        return dev
+
+    yield open_driver
+    for dev in drivers:
+        dev.close()
+
+
+@pytest.fixture
+def hardware(devices):
+    """Factory of emulated device register sets as seen by the FPGA (bypassing the driver shadow)."""
+    def regset(name: str, driver):
+        return driver._regset_t.from_buffer(devices[name].mmaps[0])
+
+    return regset
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from multiprocessing import resource_tracker
+
+from redpitaya.daq.broker import broker, client, mercury_devices
+from redpitaya.daq.ring import ring
+
+
+@pytest.fixture
+def served(devices, tmp_path):
+    """Broker serving emulated Mercury drivers, and a connected client."""
+    overlay, drivers = mercury_devices(emulate=True)
+    assert overlay is None
+    path = str(tmp_path / 'broker.sock')
+    try:
+        with broker(drivers, path=path, depth=4, timeout=2.0):
+            with client(path) as c:
+                yield c
+    finally:
+        for dev in drivers.values():
+            dev.close()
+
+
+def test_capture(served):
+    c = served
+    assert c.set('osc0', 'decimation', 125) == 125
+    assert c.set('osc0', 'trigger_post', 1024) == 1024
+    c.arm('osc0', count=2, software=True)
+    osc0 = c.ring('osc0')
+    assert osc0.wait(1, timeout=5.0)
+    data, meta = osc0.read(1)
+    assert data.shape == (osc0.size,)
+    assert data.dtype == np.int16
+    assert meta['seq'] == 1
+
+
+def test_rejected_attribute(served):
+    with pytest.raises(AttributeError):
+        served.get('osc0', 'regset')
+    with pytest.raises(AttributeError):
+        served.set('osc0', 'uio_path', '/dev/mem')
+
+
+def test_read_only_attribute(served):
+    assert served.get('osc0', 'sample_rate') == 125e6
+    with pytest.raises(AttributeError, match='read only'):
+        served.set('osc0', 'sample_rate', 1e6)
+    # the server thread keeps serving requests
+    assert served.set('osc0', 'decimation', 125) == 125
+    assert served.get('osc0', 'sample_rate') == 1e6
+
+
+def test_ring_attach_in_creating_process(monkeypatch):
+    with ring(depth=2, size=8) as owner:
+        unregistered = []
+        monkeypatch.setattr(resource_tracker, 'unregister', lambda name, rtype: unregistered.append(name))
+        reader = ring(name=owner.name)
+        # the block stays registered with the tracker for its creator
+        assert unregistered == []
+        reader.data[0] = 1
+        assert owner.data[0, 0] == 1
+        reader.close()
+        monkeypatch.undo()
@@ -0,0 +1,60 @@
+import numpy as np
+
+from redpitaya.drv.osc import osc
+from redpitaya.drv.la import la
+
+
+def test_osc_level_trigger(devices, driver):
+    dev = driver(osc, 0, 1.0)
+    # 1 MS/s, the emulated source is a 1 kHz sine at half of full scale
+    dev.decimation = 125
+    dev.trigger_pre = 2000
+    dev.trigger_post = 1000
+    dev.level = 0.0
+    dev.edge = 'pos'
+    dev.trig_src = 1 << 2
+    dev.reset()
+    dev.start()
+    assert dev.wait_done(5.0)
+    assert dev.status_trigger()
+    assert (dev.trigger_pre_status, dev.trigger_post_status) >= (2000, 1000)
+    x = dev.raw(3000).astype(float)
+    # the trigger sample is the first one after the pre trigger samples
+    assert x[1999] < 0 <= x[2000]
+    # contiguous samples of the source, starting within a sample after the crossing
+    n = np.arange(3000) - 2000
+    assert np.allclose(x, 16384 * np.sin(2 * np.pi * n / 1000), atol=110)
+
+
+def test_osc_software_trigger(devices, driver):
+    dev = driver(osc, 1, 1.0)
+    dev.decimation = 125
+    dev.trigger_pre = 0
+    dev.trigger_post = 500
+    dev.reset()
+    dev.start_trigger()
+    assert dev.wait_done(5.0)
+    assert dev.trigger_post_status == 500
+    assert dev.pointer == (dev.trigger_pre_status + 500) % osc.buffer_size
+
+
+def test_la_comparator_trigger(devices, driver):
+    dev = driver(la)
+    # the emulated source is a counter incremented every microsecond,
+    # at 0.5 MS/s each sample increments it by 2
+    dev.decimation = 250
+    dev.trigger_pre = 500
+    dev.trigger_post = 500
+    dev.trigger_mask = 0xff
+    dev.trigger_value = 0x00
+    dev.trig_src = 1 << 5
+    dev.reset()
+    dev.start()
+    assert dev.wait_done(5.0)
+    x = dev.data(1000)
+    assert isinstance(x, np.ndarray)
+    x = x.view(np.uint16).astype(int)
+    assert x[500] & 0xff == 0
+    step = np.diff(x) % 2**16
+    assert np.all((step >= 1) & (step <= 3))
+    assert abs(step.mean() - 2) < 0.01
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from redpitaya.drv.osc_fil import osc_fil
+from redpitaya.dsp.equalizer import equalizer
+
+
+def signals(n: int):
+    rng = np.random.default_rng(0)
+    t = np.arange(n)
+    return {'noise' : rng.integers(-2**15, 2**15, n),
+            'sine'  : (20000 * np.sin(2 * np.pi * t / 777) + rng.normal(0, 2, n)).astype(np.int64),
+            'zeros' : np.zeros(n, dtype=np.int64),
+            'dc'    : np.full(n, 12345),
+            'square': np.where((t // 50) % 2, -2**15, 2**15 - 1)}
+
+
+def signed(value: int, width: int) -> int:
+    """Signed value of the lowest `width` bits, like a Verilog register of that width."""
+    value &= (1 << width) - 1
+    return value - (1 << width) if value >> (width - 1) else value
+
+
+def fpga(coefficients, x, decimation: int = 1, shift: int = 0, average: bool = False) -> list:
+    """Clock by clock simulation of the FPGA filter and decimator with Python integers.
+
+    All registers are updated from their values in the previous clock,
+    register widths are those of the 16-bit sample design.
+    """
+    aa, bb, kk, pp = coefficients
+    r01 = r02 = r1 = r2 = r3 = r3_shr = r4 = r4_r = r4_rr = 0
+    y = []
+    for adc in x.tolist():
+        kk_mult = signed((r4_rr * kk) >> 24, 17)
+        y.append(min(max(kk_mult, -2**15), 2**15 - 1))
+        r01, r02, r1, r2, r3, r3_shr, r4, r4_r, r4_rr = (
+            signed(adc << 18, 34),
+            signed((adc * bb) >> 10, 30),
+            r02 - r01,
+            signed((r01 + r1) >> 10, 25),
+            signed(((r2 << 25) + (r3 << 25) - r3 * aa) >> 25, 25),
+            r3 >> 8,
+            signed(((r3_shr << 16) + r4 * pp) >> 16, 17),
+            r4,
+            r4_r)
+    out = []
+    acc = 0
+    for i, value in enumerate(y):
+        acc += value
+        if i % decimation == decimation - 1:
+            value = acc >> shift if average else value
+            out.append(min(max(value, -2**15), 2**15 - 1))
+            acc = 0
+    return out
+
+
+@pytest.mark.parametrize('input_range', sorted(osc_fil._filters))
+@pytest.mark.parametrize('name', ['noise', 'sine', 'square'])
+def test_filter_fpga(input_range, name):
+    coefficients = osc_fil._filters[input_range]
+    x = signals(5000)[name]
+    assert equalizer(coefficients).filter(x).tolist() == fpga(coefficients, x)
+
+
+@pytest.mark.parametrize('average, shift', [(False, 0), (True, 3)])
+def test_process_fpga(average, shift):
+    x = signals(4000)['sine']
+    model = equalizer(decimation=8, shift=shift, average=average)
+    y = np.concatenate([model.process(b) for b in np.array_split(x, 3)])
+    assert y.tolist() == fpga(osc_fil._filters[1.0], x, 8, shift, average)
+
+
+def reference(coefficients, x, blocks):
+    """Filter output with the IIR stages evaluated sample by sample."""
+    model = equalizer(coefficients)
+    model._LOOP_ROWS = 1
+    return np.concatenate([model.filter(b) for b in np.array_split(x, blocks, axis=-1)], axis=-1)
+
+
+@pytest.mark.parametrize('input_range', sorted(osc_fil._filters))
+@pytest.mark.parametrize('name', ['noise', 'sine', 'zeros', 'dc', 'square'])
+def test_filter_exact(input_range, name):
+    coefficients = osc_fil._filters[input_range]
+    x = signals(10000)[name]
+    model = equalizer(coefficients)
+    # blocks of uneven size, state is carried between calls
+    y = np.concatenate([model.filter(b) for b in np.array_split(x, 3)])
+    assert np.array_equal(y, reference(coefficients, x, 5))
+
+
+def test_filter_batch_exact():
+    x = np.stack(list(signals(5000).values()))
+    model = equalizer()
+    assert np.array_equal(model.filter(x), reference(osc_fil._filters[1.0], x, 1))
+
+
+def test_decimate_without_filter():
+    model = equalizer(decimation=4, average=True)
+    y = model.decimate(np.arange(10))
+    assert np.array_equal(y, [6, 22])
+    assert np.array_equal(model.decimate(np.arange(2)), [18])
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from redpitaya.dsp.measure import measure
+
+
+def periodic(shape: list, period: int, n: int) -> np.ndarray:
+    """Repeat one period given by ``(time, value)`` corners, linearly interpolated."""
+    t, v = zip(*shape)
+    return np.interp(np.arange(n) % period, t, v)
+
+
+def test_square():
+    # period 100 samples, 30 high
+    x = np.where(np.arange(10000) % 100 < 30, 1000, -1000).astype(np.int16)
+    m = measure(x, sample_period=1e-3)
+    assert m.frequency == pytest.approx(10.0)
+    assert m.period == pytest.approx(0.1)
+    assert m.duty == pytest.approx(0.3)
+    assert m.rms == pytest.approx(1000.0)
+    assert (m.top, m.base, m.vpp) == (1000, -1000, 2000)
+    assert m.edges == 99
+
+
+def test_trapezoid():
+    # 20 sample transitions, 10% to 90% takes 16 samples
+    x = periodic([(0, -1000), (80, -1000), (100, 1000), (180, 1000), (200, -1000)], 200, 8000)
+    m = measure(x, sample_period=2.0)
+    assert m.rise == pytest.approx(32.0)
+    assert m.fall == pytest.approx(32.0)
+    assert m.frequency == pytest.approx(1 / 400)
+    assert m.duty == pytest.approx(0.5)
+    assert (m.top, m.base) == (1000, -1000)
+
+
+def test_sine():
+    t = np.arange(16 * 250)
+    x = 2000 * np.sin(2 * np.pi * t / 250)
+    m = measure(x)
+    assert m.frequency == pytest.approx(1 / 250)
+    assert m.rms == pytest.approx(2000 / np.sqrt(2), rel=1e-6)
+    assert m.mean == pytest.approx(0, abs=1e-6)
+    assert m.duty == pytest.approx(0.5, abs=1e-3)
+
+
+def test_flat():
+    m = measure(np.full(1000, 123, dtype=np.int16))
+    for name in ('frequency', 'period', 'duty', 'rise', 'fall'):
+        assert np.isnan(getattr(m, name))
+    assert m.edges == 0
+    assert m.vpp == 0
+    assert m.rms == pytest.approx(123)
+
+
+def test_batch():
+    # records with different periods are measured independently
+    t = np.arange(4000)
+    data = np.stack([np.where(t % period < period // 2, 500, -500) for period in (40, 50, 80, 100, 200, 400)])
+    m = measure(data.reshape(2, 3, -1), chunk=4)
+    assert m.period.shape == (2, 3)
+    assert m.period.ravel() == pytest.approx([40, 50, 80, 100, 200, 400])
+    single = measure(data[4])
+    assert m.frequency[1, 1] == single.frequency
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('periphery')
+pytest.importorskip('iio')
+
+from redpitaya.drv.clb import clb
+from redpitaya.drv.osc import osc
+from redpitaya.overlay.mercury import mercury
+
+
+@pytest.fixture
+def pair(devices, driver):
+    """Oscilloscope pair configured for a short software triggered capture."""
+    osc0, osc1 = driver(osc, 0, 1.0), driver(osc, 1, 1.0)
+    for ch, dev in enumerate((osc0, osc1)):
+        dev.sync_src = mercury.sync_src['osc'+str(ch)]
+        dev.trig_src = mercury.trig_src['osc0']
+        dev.decimation = 125
+        dev.trigger_pre = 0
+        dev.trigger_post = 1024
+    return osc0, osc1
+
+
+def test_acquire_pair(pair):
+    osc0, osc1 = pair
+    out = mercury.acquire_pair(osc0, osc1, 1024, trigger=True, timeout=5.0)
+    assert out.shape == (2, 1024)
+    # `osc1` follows `osc0` only during the capture
+    assert osc1.sync_src == mercury.sync_src['osc1']
+
+
+def test_acquire_pair_restores_sync_on_timeout(pair):
+    osc0, osc1 = pair
+    osc0.trig_src = osc1.trig_src = 0
+    with pytest.raises(TimeoutError):
+        mercury.acquire_pair(osc0, osc1, 1024, timeout=0.05)
+    assert osc1.sync_src == mercury.sync_src['osc1']
+
+
+@pytest.mark.parametrize('name, value', [('trig_src', 0), ('trigger_pre', 16), ('trigger_post', 512)])
+def test_acquire_pair_mismatch(pair, name, value):
+    osc0, osc1 = pair
+    setattr(osc1, name, value)
+    with pytest.raises(ValueError):
+        mercury.acquire_pair(osc0, osc1, 1024, trigger=True, timeout=1.0)
+    assert osc1.sync_src == mercury.sync_src['osc1']
+
+
+@pytest.fixture
+def eeprom(tmp_path, monkeypatch):
+    """User calibration EEPROM image with different calibration for each range."""
+    data = clb._eeprom_t()
+    data.magic = clb._MAGIC2
+    for ch in range(2):
+        data.adc_lo_gain[ch] = int(20.3 / 100.0 * (1<<32))
+        data.adc_hi_gain[ch] = int(0.97 / 100.0 * (1<<32))
+        data.adc_lo_offset[ch] = 3
+        data.adc_hi_offset[ch] = -5
+        data.dac_gain[ch] = int(1.0 / 100.0 * (1<<32))
+        for i, value in enumerate((0x7d93, 0x437c7, 0xd9999a, 0x2666)):
+            data.low_filt[ch*4+i] = value
+            data.hi_filt[ch*4+i] = value + 1
+    path = tmp_path / 'eeprom'
+    path.write_bytes(bytes(clb._eeprom_offset_user) + bytes(data))
+    monkeypatch.setattr(clb, '_eeprom_device', str(path))
+
+
+def test_range_calibration(devices, driver, eeprom):
+    dev = driver(mercury.osc, 0, 1.0)
+    assert dev.calibrations[1.0] != dev.calibrations[20.0]
+    for rng, cal in (('hi', 20.0), ('lo', 1.0)):
+        dev.input_range = cal
+        assert dev.calibration == dev.calibrations[cal]
+        # FPGA calibration registers and filter follow the range
+        with clb() as calib:
+            assert calib.calib_adc_residual(dev.calib_user, 0, cal)[0] == dev.calibration[0]
+            assert calib.adc[0].gain == pytest.approx(getattr(dev.calib_user.adc[0], rng).gain, abs=1/2**14)
+        assert dev.filter_coeficients[0] == getattr(dev.calib_user.adc[0], rng).fil_aa
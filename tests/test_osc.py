@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from redpitaya.drv.osc import osc
+
+
+@pytest.fixture
+def buffer(devices):
+    """Sample buffer of emulated `osc0` filled with a ramp."""
+    buffer = np.frombuffer(devices['osc0'].mmaps[1], dtype=np.int16)
+    buffer[:] = np.arange(osc.buffer_size) - osc.buffer_size // 2
+    return buffer
+
+
+def test_raw_out(buffer, driver):
+    dev = driver(osc, 0, 1.0)
+    view = dev.raw(siz=100, ptr=200)
+    assert view.dtype == np.int16
+    assert np.array_equal(view, buffer[200:300])
+    # segment wrapping around the buffer end is copied into `out`
+    out = np.zeros(100, dtype=np.int16)
+    assert dev.raw(siz=100, ptr=osc.buffer_size - 40, out=out) is out
+    assert np.array_equal(out, np.concatenate((buffer[-40:], buffer[:60])))
+    with pytest.raises(ValueError):
+        dev.raw(siz=100, ptr=0, out=np.zeros(99, dtype=np.int16))
+
+
+@pytest.mark.parametrize('lookup', (False, True))
+@pytest.mark.parametrize('dtype', (np.float32, np.float64))
+def test_data(buffer, driver, lookup, dtype):
+    dev = driver(osc, 0, 20.0)
+    dev.lookup = lookup
+    dev.calibration = (1.01, -0.02)
+    ptr = osc.buffer_size - 40
+    expected = 1.01 * np.concatenate((buffer[-40:], buffer[:60])) * 20.0 / osc._DWr - 0.02
+    data = dev.data(siz=100, ptr=ptr, dtype=dtype)
+    assert data.dtype == dtype
+    assert np.allclose(data, expected, rtol=1e-6, atol=1e-6)
+    out = np.empty(100, dtype=dtype)
+    assert dev.data(siz=100, ptr=ptr, out=out) is out
+    assert np.array_equal(out, data)
+    with pytest.raises(ValueError):
+        dev.data(siz=100, ptr=ptr, out=np.empty(101))
+
+
+def test_calibration(buffer, driver):
+    dev = driver(osc, 0, 1.0)
+    assert dev.calibration == (1.0, 0.0)
+    default = dev.data(siz=10, ptr=0)
+    assert np.allclose(default, buffer[:10] / osc._DWr)
+    dev.calibration = (2, 0.5)
+    assert dev.calibration == (2.0, 0.5)
+    assert np.allclose(dev.data(siz=10, ptr=0), 2 * default + 0.5)
+    # the lookup table is rebuilt after a change of calibration or range
+    dev.lookup = True
+    assert np.allclose(dev.data(siz=10, ptr=0), 2 * default + 0.5)
+    dev.calibration = (1, 0)
+    assert np.allclose(dev.data(siz=10, ptr=0), default)
+    dev.input_range = 20.0
+    assert np.allclose(dev.data(siz=10, ptr=0), 20 * default)
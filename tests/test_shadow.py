@@ -0,0 +1,64 @@
+import pytest
+
+from redpitaya.drv.lg import lg
+from redpitaya.drv.clb import clb
+from redpitaya.drv.transaction import transaction
+
+
+def test_scalar_write_through(hardware, driver):
+    dev = driver(lg)
+    hw = hardware('lg', lg)
+    dev.mask = 0x5a
+    assert hw.out.cfg_msk == 0x5a
+    assert dev.mask == 0x5a
+
+
+def test_array_element_write_through(hardware, driver):
+    dev = driver(lg)
+    hw = hardware('lg', lg)
+    dev.enable = (1, 1)
+    assert hw.out.cfg_oen[:] == [1, 1]
+    assert list(dev.enable) == [1, 1]
+    dev.regset.out.cfg_oen[1] = 0
+    assert hw.out.cfg_oen[:] == [1, 0]
+    dev.default()
+    assert hw.out.cfg_oen[:] == [0, 0]
+    assert list(dev.enable) == [0, 0]
+
+
+def test_resync(hardware, driver):
+    dev = driver(lg)
+    hw = hardware('lg', lg)
+    assert dev.mask == 0
+    hw.out.cfg_msk = 7
+    assert dev.mask == 0
+    dev.regset.resync()
+    assert dev.mask == 7
+
+
+def test_structure_array_write_through(hardware, driver):
+    dev = driver(clb)
+    hw = hardware('clb', clb)
+    dev.adc[1].gain = 0.5
+    assert hw.adc[1].cfg_mul == dev.regset.adc[1].cfg_mul == 0x2000
+    hw.dac[0].cfg_sum = 5
+    # reads come from the shadow until it is synchronized
+    assert dev.regset.dac[0].cfg_sum == 0
+    dev.regset.resync()
+    assert dev.regset.dac[0].cfg_sum == 5
+
+
+def test_structure_array_staged(hardware, driver):
+    dev = driver(clb)
+    hw = hardware('clb', clb)
+    with transaction(dev):
+        dev.dac[1].offset = 0.25
+        assert hw.dac[1].cfg_sum == 0
+        assert dev.dac[1].offset == pytest.approx(0.25, abs=1e-4)
+    assert hw.dac[1].cfg_sum == int(0.25 * clb.DAC._DWr)
+    with pytest.raises(RuntimeError):
+        with transaction(dev):
+            dev.adc[0].gain = 2.0
+            raise RuntimeError()
+    assert hw.adc[0].cfg_mul == 0
+    assert dev.adc[0].gain == 0
@@ -0,0 +1,30 @@
+import pytest
+
+from redpitaya.drv.lg import lg
+from redpitaya.drv.transaction import transaction
+
+
+def test_array_element_committed(hardware, driver):
+    dev = driver(lg)
+    hw = hardware('lg', lg)
+    with transaction(dev):
+        dev.enable = (1, 0)
+        dev.mask = 3
+        # staged, not written yet
+        assert hw.out.cfg_oen[:] == [0, 0]
+        assert hw.out.cfg_msk == 0
+        assert list(dev.enable) == [1, 0]
+    assert hw.out.cfg_oen[:] == [1, 0]
+    assert hw.out.cfg_msk == 3
+    assert list(dev.enable) == [1, 0]
+
+
+def test_abort_on_exception(hardware, driver):
+    dev = driver(lg)
+    hw = hardware('lg', lg)
+    with pytest.raises(RuntimeError):
+        with transaction(dev):
+            dev.enable = (1, 1)
+            raise RuntimeError()
+    assert hw.out.cfg_oen[:] == [0, 0]
+    assert list(dev.enable) == [0, 0]
@@ -0,0 +1,138 @@
+import os
+import sys
+import socket
+import asyncio
+import threading
+
+import pytest
+
+from redpitaya.drv.uio import uio
+from redpitaya.drv.osc import osc
+
+
+@pytest.fixture
+def node(tmp_path):
+    """Fake UIO device node, a regular file with a sysfs map description."""
+    maps = tmp_path / 'sys' / 'uio0' / 'maps' / 'map0'
+    maps.mkdir(parents=True)
+    for name, value in (('name', 'regset'), ('addr', '0x40000000'), ('offset', '0x0'), ('size', '0x1000')):
+        (maps / name).write_text(value + '\n')
+    (tmp_path / 'uio0').write_bytes(bytes(0x1000))
+    os.symlink(str(tmp_path / 'uio0'), str(tmp_path / 'fake'))
+
+    class fake(uio):
+        sysfs = str(tmp_path / 'sys')
+
+    return fake, str(tmp_path / 'fake')
+
+
+def test_shared_handle(node):
+    cls, path = node
+    a, b = cls(path), cls(path)
+    assert a.uio_handle is b.uio_handle
+    a.close()
+    assert b.uio_handle.refs == 1
+    b.close()
+    # the device is unlocked after the last release
+    cls(path).close()
+
+
+def test_concurrent_open_close(node):
+    cls, path = node
+    errors = []
+
+    def loop():
+        try:
+            for _ in range(500):
+                cls(path).close()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=loop) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+@pytest.fixture
+def irq(node):
+    """Fake device with the interrupt file replaced by a socket pair, the other end acts as the kernel."""
+    cls, path = node
+    dev = cls(path)
+    kernel, dev.uio_dev = socket.socketpair()
+    yield dev, kernel
+    dev.uio_dev.close()
+    kernel.close()
+    dev.close()
+
+
+def counter(value: int) -> bytes:
+    return value.to_bytes(4, byteorder=sys.byteorder)
+
+
+def test_irq_enable_disable(irq):
+    dev, kernel = irq
+    dev.irq_enable()
+    assert kernel.recv(4) == counter(1)
+    dev.irq_disable()
+    assert kernel.recv(4) == counter(0)
+
+
+def test_irq_wait(irq):
+    dev, kernel = irq
+    assert not dev.pool()
+    kernel.send(counter(5))
+    assert dev.pool(1.0)
+    assert dev.irq_wait() == 5
+    # a skipped counter value is a missed interrupt
+    kernel.send(counter(7))
+    assert dev.irq_wait() == 7
+    assert (dev.irq_handled, dev.irq_missed) == (2, 1)
+
+
+def test_irq_async(irq):
+    dev, kernel = irq
+
+    def raise_irq():
+        # the interrupt is raised only after it was enabled
+        assert kernel.recv(4) == counter(1)
+        kernel.send(counter(3))
+
+    thread = threading.Thread(target=raise_irq)
+    thread.start()
+    assert asyncio.run(asyncio.wait_for(dev.irq(), 5.0)) == 3
+    thread.join()
+
+
+def test_irq_available(irq):
+    dev, kernel = irq
+    # no interrupt in the device tree node, checking does not write to the device
+    assert not dev.irq_available
+    kernel.setblocking(False)
+    with pytest.raises(BlockingIOError):
+        kernel.recv(4)
+
+
+def test_irq_available_device_tree(tmp_path, node):
+    of_node = tmp_path / 'sys' / 'uio0' / 'device' / 'of_node'
+    of_node.mkdir(parents=True)
+    (of_node / 'interrupts').write_bytes(bytes(12))
+    cls, path = node
+    with cls(path) as dev:
+        assert dev.irq_available
+
+
+def test_wait_done_irq(devices, driver):
+    dev = driver(osc, 0, 1.0)
+    assert dev.irq_available
+    # long enough for the interrupt to be enabled before the capture ends
+    dev.decimation = 12500
+    dev.trigger_pre = 0
+    dev.trigger_post = 1024
+    dev.reset()
+    dev.start_trigger()
+    assert dev.wait_done(5.0)
+    assert dev.irq_handled >= 1
+    assert not dev.status_run()